@@ -2,12 +2,28 @@ import datetime
 import requests
 import os
 import argparse
+import asyncio
+import atexit
+import bisect
+import csv
+import concurrent.futures
+import io
+import itertools
 import re
 import json
+import mmap
+import sys
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
 from dateutil.easter import easter
 from dateutil.relativedelta import relativedelta as rd, FR
-from holidays.constants import JAN, MAY, AUG, OCT, NOV, DEC
+from holidays.constants import JAN, FEB, APR, MAY, JUL, AUG, SEP, OCT, NOV, DEC
 from holidays.holiday_base import HolidayBase
+from requests.adapters import HTTPAdapter
 
 
 
@@ -28,11 +44,39 @@ class VacacionesEcuador(HolidayBase):
         Construye todos los atributos necesarios para el objeto HolidayEcuador.
     _populate(self, anio):
         Devoluciones si una fecha es feriado o no
+    nacionales(cls, anio):
+        Devuelve los feriados nacionales del año, calculados una sola vez por proceso
+    provinciales(cls, anio, prov):
+        Devuelve los feriados propios de la provincia (FERIADOS_PROVINCIALES)
+    decodificar_provincias(cls, mascara):
+        Devuelve los códigos de provincia de una máscara de bits de provincias
+    feriados_rango(cls, desde, hasta, prov=None):
+        Devuelve todos los feriados de un rango de años como arreglo datetime64[D], calculados de forma vectorizada
     """     
     # ISO 3166-2 codigos de la principal subdivision, 
     # Provincias llamadas
     # https://es.wikipedia.org/wiki/ISO_3166-2:EC
-    PROVINCIAS = ["EC-P"]  # TODO añadir mas provincias
+    PROVINCIAS = ["EC-A", "EC-B", "EC-C", "EC-D", "EC-E", "EC-F", "EC-G", "EC-H", "EC-I", "EC-L", "EC-M", "EC-N",
+                  "EC-O", "EC-P", "EC-R", "EC-S", "EC-SD", "EC-SE", "EC-T", "EC-U", "EC-W", "EC-X", "EC-Y", "EC-Z"]
+    # Feriados provinciales (fundación o independencia de la capital) que se suman a los nacionales:
+    # provincia -> tupla de (mes, día, nombre); se trasladan con las mismas reglas que el día del trabajo
+    FERIADOS_PROVINCIALES = {
+        "EC-A": ((APR, 12, "Fundación de Cuenca [Foundation of Cuenca]"),),
+        "EC-E": ((AUG, 5, "Independencia de Esmeraldas [Independence of Esmeraldas]"),),
+        "EC-G": ((JUL, 25, "Fundación de Guayaquil [Foundation of Guayaquil]"),),
+        "EC-H": ((APR, 21, "Independencia de Riobamba [Independence of Riobamba]"),),
+        "EC-I": ((SEP, 28, "Fundación de Ibarra [Foundation of Ibarra]"),),
+        "EC-L": ((NOV, 18, "Independencia de Loja [Independence of Loja]"),),
+        "EC-M": ((OCT, 18, "Independencia de Portoviejo [Independence of Portoviejo]"),),
+        "EC-P": ((DEC, 6, "Fundación de Quito [Foundation of Quito]"),),
+        "EC-T": ((NOV, 12, "Independencia de Ambato [Independence of Ambato]"),),
+        "EC-W": ((FEB, 12, "Provincialización de Galápagos [Galápagos Province Day]"),),
+        "EC-X": ((NOV, 11, "Independencia de Latacunga [Independence of Latacunga]"),),
+    }
+    # Versión de las reglas de _populate; se guarda en los índices binarios para detectar índices desactualizados
+    VERSION_REGLAS = 2
+    # Feriados nacionales ya calculados: anio -> tupla de (fecha, nombre)
+    _NACIONALES = {}
 
     def __init__(self, **kwargs):
         """
@@ -54,72 +98,208 @@ class VacacionesEcuador(HolidayBase):
         -------
         Devuelve verdadero si una fecha es un día festivo, de lo contrario,
         se muestra como verdadero.
-        """                    
+        """
+        # Feriados nacionales (calculados una sola vez por año) más los de la provincia
+        for fecha, nombre in self.nacionales(anio):
+            self[fecha] = nombre
+        for fecha, nombre in self.provinciales(anio, self.prov):
+            self[fecha] = nombre
+
+    @classmethod
+    def nacionales(cls, anio):
+        """
+        Devuelve los feriados nacionales del año, compartidos por todas las provincias
+
+        Parámetros
+        ----------
+        anio : int
+        Devoluciones
+        -------
+        Devuelve una tupla de pares (fecha, nombre)
+        """
+        feriados = cls._NACIONALES.get(anio)
+        if feriados is None:
+            feriados = cls._NACIONALES[anio] = tuple(cls._calcular_nacionales(anio).items())
+        return feriados
+
+    @staticmethod
+    def _trasladar(fecha):
+        """
+        Aplica a un feriado el traslado de la Ley 858/Ley Reformatoria a la LOSEP (vigente desde el 21 de diciembre
+        de 2016 /R.O # 906): sábado o martes al viernes o lunes anterior, domingo al lunes siguiente
+        y miércoles o jueves al viernes de esa semana
+        """
+        if fecha.year <= 2015:
+            return fecha
+        dia_semana = fecha.weekday()
+        if dia_semana in (5, 1):
+            return fecha - datetime.timedelta(days=1)
+        if dia_semana == 6:
+            return fecha + datetime.timedelta(days=1)
+        if dia_semana in (2, 3):
+            return fecha + rd(weekday=FR)
+        return fecha
+
+    @classmethod
+    def provinciales(cls, anio, prov):
+        """
+        Devuelve los feriados propios de una provincia (sin los nacionales), con el traslado de la LOSEP
+
+        Parámetros
+        ----------
+        anio : int
+        prov : str
+            código de provincia según ISO3166-2
+        Devoluciones
+        -------
+        Devuelve una lista de pares (fecha, nombre)
+        """
+        return [(cls._trasladar(datetime.date(anio, mes, dia)), nombre)
+                for mes, dia, nombre in cls.FERIADOS_PROVINCIALES.get(prov, ())]
+
+    @classmethod
+    def decodificar_provincias(cls, mascara):
+        """Devuelve los códigos de provincia de una máscara de CacheFeriados.provincias() (bit i = PROVINCIAS[i])"""
+        return [prov for i, prov in enumerate(cls.PROVINCIAS) if mascara >> i & 1]
+
+    # Feriados fijos que se trasladan con las reglas de la LOSEP desde 2016: (mes, día)
+    _TRASLADABLES = ((MAY, 1), (MAY, 24), (AUG, 10), (OCT, 9))
+
+    @staticmethod
+    def _fechas_lote(anios, mes, dia):
+        """Convierte columnas de año, mes y día en datetime64[D]"""
+        meses = (np.asarray(anios) - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (np.asarray(mes) - 1)
+        return meses.astype('datetime64[D]') + (np.asarray(dia) - 1)
+
+    @staticmethod
+    def _pascua_lote(anios):
+        """Versión vectorizada de dateutil.easter.easter() (método occidental) para un arreglo de años"""
+        g = anios % 19
+        c = anios // 100
+        h = (c - c // 4 - (8 * c + 13) // 25 + 19 * g + 15) % 30
+        i = h - (h // 28) * (1 - (h // 28) * (29 // (h + 1)) * ((21 - g) // 11))
+        j = (anios + anios // 4 + i + 2 - c + c // 4) % 7
+        p = i - j
+        return VacacionesEcuador._fechas_lote(anios, 3 + (p + 26) // 30, 1 + (p + 27 + (p + 6) // 40) % 31)
+
+    @staticmethod
+    def _trasladar_lote(fechas, anios):
+        """Versión vectorizada de _trasladar() para un arreglo datetime64[D] y el año de cada fecha"""
+        # 1970-01-01 fue jueves (weekday() == 3)
+        dia_semana = (fechas.astype(np.int64) + 3) % 7
+        desplazamiento = np.select(
+            [np.isin(dia_semana, (5, 1)), dia_semana == 6, np.isin(dia_semana, (2, 3))],
+            [-1, 1, 4 - dia_semana], 0)
+        return fechas + np.where(anios > 2015, desplazamiento, 0)
+
+    @classmethod
+    def feriados_rango(cls, desde, hasta, prov=None):
+        """
+        Calcula en una sola pasada vectorizada todos los feriados de un rango de años, con los mismos
+        resultados que _populate (carnaval y Semana Santa a partir de la Pascua, traslados de la LOSEP
+        y reglas de los días de difuntos e independencia de Cuenca)
+
+        Parámetros
+        ----------
+        desde, hasta : int
+            rango de años incluido (ambos extremos)
+        prov : str, opcional
+            código de provincia según ISO3166-2 cuyos feriados propios se añaden (por defecto solo los nacionales)
+        Devoluciones
+        -------
+        Devuelve un arreglo datetime64[D] ordenado y sin repetidos, listo para np.isin()
+        """
+        anios = np.arange(desde, hasta + 1, dtype=np.int64)
+        pascua = cls._pascua_lote(anios)
+        fechas = [
+            cls._fechas_lote(anios, JAN, 1),
+            cls._fechas_lote(anios, DEC, 25),
+            pascua - 2,
+            pascua,
+            # Carnaval: lunes y martes antes de los 46 días de cuaresma
+            pascua - 48,
+            pascua - 47]
+        fechas.extend(cls._trasladar_lote(cls._fechas_lote(anios, mes, dia), anios)
+                      for mes, dia in cls._TRASLADABLES)
+        fechas.extend(cls._trasladar_lote(cls._fechas_lote(anios, mes, dia), anios)
+                      for mes, dia, _ in cls.FERIADOS_PROVINCIALES.get(prov, ()))
+
+        # Días de difuntos (2 de noviembre) e independencia de Cuenca (3 de noviembre) según el día de la semana del 3
+        noviembre_3 = cls._fechas_lote(anios, NOV, 3)
+        dia_semana = (noviembre_3.astype(np.int64) + 3) % 7
+        fechas.append(noviembre_3 + np.select([dia_semana == 6, dia_semana == 2, dia_semana == 5], [1, -2, -2], 0))
+        fechas.append(noviembre_3 + np.select([dia_semana == 6, np.isin(dia_semana, (3, 0))], [-2, 1], -1))
+        return np.unique(np.concatenate(fechas))
+
+    @staticmethod
+    def _calcular_nacionales(anio):
+        """Calcula los feriados nacionales de un año como dict {fecha: nombre}"""
+        feriados = {}
         #Dia de anio nuevo 
-        self[datetime.date(anio, JAN, 1)] = "Año Nuevo [New Year's Day]"
+        feriados[datetime.date(anio, JAN, 1)] = "Año Nuevo [New Year's Day]"
         
         # Navidad
-        self[datetime.date(anio, DEC, 25)] = "Navidad [Christmas]"
+        feriados[datetime.date(anio, DEC, 25)] = "Navidad [Christmas]"
         
         #Semana Santa
-        self[easter(anio) + rd(diaLab=FR(-1))] = "Semana Santa (Viernes Santo) [Good Friday)]"
-        self[easter(anio)] = "Día de Pascuas [Easter dia]"
+        feriados[easter(anio) + rd(weekday=FR(-1))] = "Semana Santa (Viernes Santo) [Good Friday)]"
+        feriados[easter(anio)] = "Día de Pascuas [Easter dia]"
         
         # Carnaval
         cuaresma = 46
-        self[easter(anio) - datetime.timedelta(dias=cuaresma+2)] = "Lunes de carnaval [Carnival of Monday)]"
-        self[easter(anio) - datetime.timedelta(dias=cuaresma+1)] = "Martes de carnaval [Tuesday of Carnival)]"
+        feriados[easter(anio) - datetime.timedelta(days=cuaresma+2)] = "Lunes de carnaval [Carnival of Monday)]"
+        feriados[easter(anio) - datetime.timedelta(days=cuaresma+1)] = "Martes de carnaval [Tuesday of Carnival)]"
         
         # Dia del trabajo
         nombre = "Día Nacional del Trabajo [Labour dia]"
         # (Ley 858/Ley Reformatoria a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) Si el feriado cae en sábado o martes
         # el descanso obligatorio irá al viernes o lunes inmediato anterior
         # respectivamente
-        if anio > 2015 and datetime.date(anio, MAY, 1).diaLab() in (5,1):
-            self[datetime.date(anio, MAY, 1) - datetime.timedelta(dias=1)] = nombre
+        if anio > 2015 and datetime.date(anio, MAY, 1).weekday() in (5,1):
+            feriados[datetime.date(anio, MAY, 1) - datetime.timedelta(days=1)] = nombre
         # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016/R.O # 906)) si el feriado cae en domingo
          # el descanso obligatorio sera para el lunes siguiente
-        elif anio > 2015 and datetime.date(anio, MAY, 1).diaLab() == 6:
-            self[datetime.date(anio, MAY, 1) + datetime.timedelta(dias=1)] = nombre
+        elif anio > 2015 and datetime.date(anio, MAY, 1).weekday() == 6:
+            feriados[datetime.date(anio, MAY, 1) + datetime.timedelta(days=1)] = nombre
         # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) Feriados que sean en miércoles o jueves
          # se moverá al viernes de esa semana
-        elif anio > 2015 and  datetime.date(anio, MAY, 1).diaLab() in (2,3):
-            self[datetime.date(anio, MAY, 1) + rd(diaLab=FR)] = nombre
+        elif anio > 2015 and  datetime.date(anio, MAY, 1).weekday() in (2,3):
+            feriados[datetime.date(anio, MAY, 1) + rd(weekday=FR)] = nombre
         else:
-            self[datetime.date(anio, MAY, 1)] = nombre
+            feriados[datetime.date(anio, MAY, 1)] = nombre
         
         # Batalla de Pichincha, las reglas son las mismas que el día del trabajo
         nombre = "Batalla del Pichincha [Pichincha Battle]"
-        if anio > 2015 and datetime.date(anio, MAY, 24).diaLab() in (5,1):
-            self[datetime.date(anio, MAY, 24).diaLab() - datetime.timedelta(dias=1)] = nombre
-        elif anio > 2015 and datetime.date(anio, MAY, 24).diaLab() == 6:
-            self[datetime.date(anio, MAY, 24) + datetime.timedelta(dias=1)] = nombre
-        elif anio > 2015 and  datetime.date(anio, MAY, 24).diaLab() in (2,3):
-            self[datetime.date(anio, MAY, 24) + rd(diaLab=FR)] = nombre
+        if anio > 2015 and datetime.date(anio, MAY, 24).weekday() in (5,1):
+            feriados[datetime.date(anio, MAY, 24) - datetime.timedelta(days=1)] = nombre
+        elif anio > 2015 and datetime.date(anio, MAY, 24).weekday() == 6:
+            feriados[datetime.date(anio, MAY, 24) + datetime.timedelta(days=1)] = nombre
+        elif anio > 2015 and  datetime.date(anio, MAY, 24).weekday() in (2,3):
+            feriados[datetime.date(anio, MAY, 24) + rd(weekday=FR)] = nombre
         else:
-            self[datetime.date(anio, MAY, 24)] = nombre        
+            feriados[datetime.date(anio, MAY, 24)] = nombre        
         
         # Primer Grito de Independencia, las reglas son las mismas que el día del trabajo  
         nombre = "Primer Grito de la Independencia [First Cry of Independence]"
-        if anio > 2015 and datetime.date(anio, AUG, 10).diaLab() in (5,1):
-            self[datetime.date(anio, AUG, 10)- datetime.timedelta(dias=1)] = nombre
-        elif anio > 2015 and datetime.date(anio, AUG, 10).diaLab() == 6:
-            self[datetime.date(anio, AUG, 10) + datetime.timedelta(dias=1)] = nombre
-        elif anio > 2015 and  datetime.date(anio, AUG, 10).diaLab() in (2,3):
-            self[datetime.date(anio, AUG, 10) + rd(diaLab=FR)] = nombre
+        if anio > 2015 and datetime.date(anio, AUG, 10).weekday() in (5,1):
+            feriados[datetime.date(anio, AUG, 10)- datetime.timedelta(days=1)] = nombre
+        elif anio > 2015 and datetime.date(anio, AUG, 10).weekday() == 6:
+            feriados[datetime.date(anio, AUG, 10) + datetime.timedelta(days=1)] = nombre
+        elif anio > 2015 and  datetime.date(anio, AUG, 10).weekday() in (2,3):
+            feriados[datetime.date(anio, AUG, 10) + rd(weekday=FR)] = nombre
         else:
-            self[datetime.date(anio, AUG, 10)] = nombre       
+            feriados[datetime.date(anio, AUG, 10)] = nombre       
         
         # Guayaquil's independence, the rules are the same as the labor dia
         nombre = "Independencia de Guayaquil [Guayaquil's Independence]"
-        if anio > 2015 and datetime.date(anio, OCT, 9).diaLab() in (5,1):
-            self[datetime.date(anio, OCT, 9) - datetime.timedelta(dias=1)] = nombre
-        elif anio > 2015 and datetime.date(anio, OCT, 9).diaLab() == 6:
-            self[datetime.date(anio, OCT, 9) + datetime.timedelta(dias=1)] = nombre
-        elif anio > 2015 and  datetime.date(anio, MAY, 1).diaLab() in (2,3):
-            self[datetime.date(anio, OCT, 9) + rd(diaLab=FR)] = nombre
+        if anio > 2015 and datetime.date(anio, OCT, 9).weekday() in (5,1):
+            feriados[datetime.date(anio, OCT, 9) - datetime.timedelta(days=1)] = nombre
+        elif anio > 2015 and datetime.date(anio, OCT, 9).weekday() == 6:
+            feriados[datetime.date(anio, OCT, 9) + datetime.timedelta(days=1)] = nombre
+        elif anio > 2015 and  datetime.date(anio, OCT, 9).weekday() in (2,3):
+            feriados[datetime.date(anio, OCT, 9) + rd(weekday=FR)] = nombre
         else:
-            self[datetime.date(anio, OCT, 9)] = nombre        
+            feriados[datetime.date(anio, OCT, 9)] = nombre        
         
         # Dia de muertos y 
         nombredd = "Día de los difuntos [dia of the Dead]" 
@@ -128,357 +308,3739 @@ class VacacionesEcuador(HolidayBase):
         #(Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906))
         #Para festivos nacionales y/o locales que coincidan en días corridos,
         #se aplicarán las siguientes reglas:
-        if (datetime.date(anio, NOV, 2).diaLab() == 5 and  datetime.date(anio, NOV, 3).diaLab() == 6):
-            self[datetime.date(anio, NOV, 2) - datetime.timedelta(dias=1)] = nombredd
-            self[datetime.date(anio, NOV, 3) + datetime.timedelta(dias=1)] = nombreic     
-        elif (datetime.date(anio, NOV, 3).diaLab() == 2):
-            self[datetime.date(anio, NOV, 2)] = nombredd
-            self[datetime.date(anio, NOV, 3) - datetime.timedelta(dias=2)] = nombreic
-        elif (datetime.date(anio, NOV, 3).diaLab() == 3):
-            self[datetime.date(anio, NOV, 3)] = nombreic
-            self[datetime.date(anio, NOV, 2) + datetime.timedelta(dias=2)] = nombredd
-        elif (datetime.date(anio, NOV, 3).diaLab() == 5):
-            self[datetime.date(anio, NOV, 2)] =  nombredd
-            self[datetime.date(anio, NOV, 3) - datetime.timedelta(dias=2)] = nombreic
-        elif (datetime.date(anio, NOV, 3).diaLab() == 0):
-            self[datetime.date(anio, NOV, 3)] = nombreic
-            self[datetime.date(anio, NOV, 2) + datetime.timedelta(dias=2)] = nombredd
+        if (datetime.date(anio, NOV, 2).weekday() == 5 and  datetime.date(anio, NOV, 3).weekday() == 6):
+            feriados[datetime.date(anio, NOV, 2) - datetime.timedelta(days=1)] = nombredd
+            feriados[datetime.date(anio, NOV, 3) + datetime.timedelta(days=1)] = nombreic     
+        elif (datetime.date(anio, NOV, 3).weekday() == 2):
+            feriados[datetime.date(anio, NOV, 2)] = nombredd
+            feriados[datetime.date(anio, NOV, 3) - datetime.timedelta(days=2)] = nombreic
+        elif (datetime.date(anio, NOV, 3).weekday() == 3):
+            feriados[datetime.date(anio, NOV, 3)] = nombreic
+            feriados[datetime.date(anio, NOV, 2) + datetime.timedelta(days=2)] = nombredd
+        elif (datetime.date(anio, NOV, 3).weekday() == 5):
+            feriados[datetime.date(anio, NOV, 2)] =  nombredd
+            feriados[datetime.date(anio, NOV, 3) - datetime.timedelta(days=2)] = nombreic
+        elif (datetime.date(anio, NOV, 3).weekday() == 0):
+            feriados[datetime.date(anio, NOV, 3)] = nombreic
+            feriados[datetime.date(anio, NOV, 2) + datetime.timedelta(days=2)] = nombredd
         else:
-            self[datetime.date(anio, NOV, 2)] = nombredd
-            self[datetime.date(anio, NOV, 3)] = nombreic  
-            
-        #Fundacion de Quito, aplica solo en la provincia de Pichincha
-        # las reglas son las mismas que el día del trabajo
-        name = "Fundación de Quito [Foundation of Quito]"        
-        if self.prov in ("EC-P"):
-            if anio > 2015 and datetime.date(anio, DEC, 6).diaLab() in (5,1):
-                self[datetime.date(anio, DEC, 6) - datetime.timedelta(dias=1)] = name
-            elif anio > 2015 and datetime.date(anio, DEC, 6).diaLab() == 6:
-                self[(datetime.date(anio, DEC, 6).diaLab()) + datetime.timedelta(dias=1)] =name
-            elif anio > 2015 and  datetime.date(anio, DEC, 6).diaLab() in (2,3):
-                self[datetime.date(anio, DEC, 6) + rd(diaLab=FR)] = name
-            else:
-                self[datetime.date(anio, DEC, 6)] = name
+            feriados[datetime.date(anio, NOV, 2)] = nombredd
+            feriados[datetime.date(anio, NOV, 3)] = nombreic
+        return feriados
 
-class PicoPlaca:
+
+class Metricas:
     """
-    Una clase para representar un vehículo.
-    medida de restricción (Pico y Placa) 
-    - ORDENANZA METROPOLITANA No. 0305
-    http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+    Contadores, temporizadores por etapa e histogramas de latencia del predictor.
+    Mientras activo es False la recolección se reduce a comprobar ese atributo en cada punto medido.
     ...
     Atributos
     ----------
-    placa : str 
-        El registro o patente de un vehículo es una combinación de caracteres alfabéticos o numéricos
-        caracteres que identifican e individualizan el vehículo respecto de los demás;
-        
-        El formato utilizado es
-        XX-YYYY o XXX-YYYY,
-        donde X es una letra mayúscula e Y es un dígito.
-    fecha : str
-        Fecha en la que el vehículo pretende transitar
-        esta siguiendo el
-        Formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
-    hora : str
-        tiempo en que el vehículo pretende transitar
-        esta siguiendo el formato
-        HH:MM: por ejemplo, 08:35, 19:30
-    online: boolean, opcional
-        if online == Cierto, se utilizará la API abstracta de días festivos
-    Metodos
+    activo : bool
+        si se recolectan métricas
+    Métodos
     -------
-    __init__(self, placa, fecha, hora, online=False):
-        Construye todos los atributos necesarios.
-        para el objeto PicoPlaca.
-    placa(self):
-        Obtiene el valor del atributo de placa
-    placa(self, value):
-        Establece el valor del atributo de la placa
-    fecha(self):
-        Obtiene el valor del atributo de fecha
-    fecha(self, value):
-        Establece el valor del atributo de fecha
-    hora(self):
-        Obtiene el valor del atributo de tiempo
-    hora(self, value):
-        Establece el valor del atributo de tiempo
-    __EncontrarDia(self, fecha):
-        Devuelve el día a partir de la fecha: por ejemplo, miércoles
-    __horaProhibida(self, VerificarHora):
-        Devuelve True si el tiempo proporcionado está dentro de las horas pico prohibidas, de lo contrario, Falso
-    __feriado:
-        Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, Falso
-    predecir(self):
-        Devuelve True si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora especificadas, de lo contrario, Falso
-    """ 
-    #Dias de la semana
-    __dias = [
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday"]
-
-    # Diccionario que contiene las restricciones de la forma {día: último dígito prohibido}
-    __restricciones = {
-            "Monday": [1, 2],
-            "Tuesday": [3, 4],
-            "Wednesday": [5, 6],
-            "Thursday": [7, 8],
-            "Friday": [9, 0],
-            "Saturday": [],
-            "Sunday": []}
+    activar(self, activo=True):
+        Activa o desactiva la recolección
+    tiempo(self, etapa, segundos):
+        Acumula la duración de una etapa
+    contar(self, nombre, etiqueta=None, n=1):
+        Incrementa un contador, opcionalmente etiquetado
+    observar(self, nombre, segundos):
+        Registra una latencia en un histograma
+    estadisticas(self):
+        Devuelve todas las métricas como dict, incluidas las de CACHE_FERIADOS
+    prometheus(self):
+        Devuelve todas las métricas en el formato de texto de Prometheus
+    reiniciar(self):
+        Pone todas las métricas en cero
+    """
+    # Límites superiores (segundos) de los histogramas de latencia
+    LIMITES = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
-    def __init__(self, placa, fecha, tiempo, online=False):
+    def __init__(self):
+        """Construye un registro de métricas vacío y desactivado"""
+        self.activo = False
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def activar(self, activo=True):
+        """Activa o desactiva la recolección de métricas"""
+        self.activo = activo
+
+    def reiniciar(self):
+        """Pone todas las métricas en cero"""
+        with self._lock:
+            self._etapas = {}
+            self._contadores = {}
+            self._histogramas = {}
+
+    def tiempo(self, etapa, segundos):
+        """Acumula la duración (en segundos) y el número de llamadas de una etapa"""
+        with self._lock:
+            total, llamadas = self._etapas.get(etapa, (0.0, 0))
+            self._etapas[etapa] = (total + segundos, llamadas + 1)
+
+    def contar(self, nombre, etiqueta=None, n=1):
+        """Incrementa en n el contador nombre (con la etiqueta dada, si la hay)"""
+        with self._lock:
+            clave = (nombre, etiqueta)
+            self._contadores[clave] = self._contadores.get(clave, 0) + n
+
+    def observar(self, nombre, segundos):
+        """Registra una latencia (en segundos) en el histograma nombre"""
+        i = bisect.bisect_left(self.LIMITES, segundos)
+        with self._lock:
+            cubetas, suma, cantidad = self._histogramas.get(nombre, ([0] * (len(self.LIMITES) + 1), 0.0, 0))
+            cubetas[i] += 1
+            self._histogramas[nombre] = (cubetas, suma + segundos, cantidad + 1)
+
+    def estadisticas(self):
         """
-        Construye todos los atributos necesarios para el objeto PicoPlaca.
-        
-        Parámetros
-        ----------
-            placa : calle
-                El registro o patente de un vehículo es una combinación de caracteres alfabéticos o numéricos
-                caracteres que identifican e individualizan el vehículo respecto de los demás;
-                El formato utilizado es AA-YYYY o XXX-YYYY, donde X es una letra mayúscula e Y es un dígito.
-            fecha: calle
-                Fecha en la que el vehículo pretende transitar
-                Sigue el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
-            tiempo: calle
-                tiempo en que el vehículo pretende transitar
-                Sigue el formato HH:MM: por ejemplo, 08:35, 19:30
-            en línea: booleano, opcional
-                si en línea == Verdadero, se usará la API de días festivos abstractos (el valor predeterminado es Falso)               
-        """                
-        self.placa = placa
-        self.fecha = fecha
-        self.tiempo = tiempo
-        self.online = online
+        Devuelve todas las métricas
+
+        Devoluciones
+        -------
+        Devuelve un dict con las claves etapas ({etapa: {segundos, llamadas}}), contadores
+        ({nombre: valor} o {nombre: {etiqueta: valor}}), histogramas ({nombre: {limites, cubetas, suma, cantidad}})
+        y cache_feriados (estadísticas de CACHE_FERIADOS)
+        """
+        with self._lock:
+            contadores = {}
+            for (nombre, etiqueta), valor in sorted(self._contadores.items(), key=lambda c: (c[0][0], str(c[0][1]))):
+                if etiqueta is None:
+                    contadores[nombre] = valor
+                else:
+                    contadores.setdefault(nombre, {})[etiqueta] = valor
+            return {
+                'etapas': {e: {'segundos': t, 'llamadas': n} for e, (t, n) in sorted(self._etapas.items())},
+                'contadores': contadores,
+                'histogramas': {
+                    nombre: {'limites': list(self.LIMITES) + ['+Inf'], 'cubetas': list(cubetas),
+                             'suma': suma, 'cantidad': cantidad}
+                    for nombre, (cubetas, suma, cantidad) in sorted(self._histogramas.items())},
+                'cache_feriados': CACHE_FERIADOS.estadisticas(),
+            }
 
+    def prometheus(self):
+        """Devuelve todas las métricas en el formato de texto de Prometheus (versión 0.0.4)"""
+        datos = self.estadisticas()
+        lineas = [
+            '# TYPE pico_placa_etapa_segundos_total counter',
+            '# TYPE pico_placa_etapa_llamadas_total counter']
+        for etapa, valores in datos['etapas'].items():
+            lineas.append('pico_placa_etapa_segundos_total{{etapa="{}"}} {!r}'.format(etapa, valores['segundos']))
+            lineas.append('pico_placa_etapa_llamadas_total{{etapa="{}"}} {}'.format(etapa, valores['llamadas']))
+        for nombre, valor in datos['contadores'].items():
+            lineas.append('# TYPE pico_placa_{}_total counter'.format(nombre))
+            if isinstance(valor, dict):
+                for etiqueta, n in valor.items():
+                    lineas.append('pico_placa_{}_total{{tipo="{}"}} {}'.format(nombre, etiqueta, n))
+            else:
+                lineas.append('pico_placa_{}_total {}'.format(nombre, valor))
+        for nombre, histograma in datos['histogramas'].items():
+            lineas.append('# TYPE pico_placa_{}_segundos histogram'.format(nombre))
+            acumulado = 0
+            for limite, n in zip(histograma['limites'], histograma['cubetas']):
+                acumulado += n
+                lineas.append('pico_placa_{}_segundos_bucket{{le="{}"}} {}'.format(nombre, limite, acumulado))
+            lineas.append('pico_placa_{}_segundos_sum {!r}'.format(nombre, histograma['suma']))
+            lineas.append('pico_placa_{}_segundos_count {}'.format(nombre, histograma['cantidad']))
+        cache = datos['cache_feriados']
+        lineas += [
+            '# TYPE pico_placa_cache_feriados_aciertos_total counter',
+            'pico_placa_cache_feriados_aciertos_total {}'.format(cache['aciertos']),
+            '# TYPE pico_placa_cache_feriados_fallos_total counter',
+            'pico_placa_cache_feriados_fallos_total {}'.format(cache['fallos']),
+            '# TYPE pico_placa_cache_feriados_entradas gauge',
+            'pico_placa_cache_feriados_entradas {}'.format(cache['entradas'])]
+        return '\n'.join(lineas) + '\n'
 
-    @property
-    def placa(self):
-        """Tiene el atributo de la placa un valor"""
-        return self._placa
 
+# Métricas del proceso; se activan con METRICAS.activar() o con la opción --stats
+METRICAS = Metricas()
 
-    @placa.setter
-    def placa(self, valor):
+
+class IndiceFeriados:
+    """
+    Índice binario de feriados precalculados con VacacionesEcuador para un rango de años y todas las provincias,
+    abierto con mmap para que varios procesos compartan las mismas páginas sin copiarlas.
+    ...
+    Formato del archivo (little-endian)
+    ----------
+    cabecera : MAGIA, formato, versión de reglas, año desde, año hasta, número de provincias,
+        número de nombres, número de feriados
+    provincias : por cada calendario, código de provincia (8 bytes; vacío para el calendario nacional),
+        primer feriado y cantidad de feriados
+    dias : int32 por feriado, días desde 1970-01-01, ordenados dentro de cada provincia
+    nombres_id : uint16 por feriado, índice en la tabla de nombres
+    nombres : desplazamientos uint32 (número de nombres + 1) seguidos de los nombres en UTF-8
+    Atributos
+    ----------
+    ruta : str
+        archivo del índice
+    desde, hasta : int
+        rango de años incluido (ambos extremos)
+    provincias : dict
+        código de provincia (None para el calendario nacional) -> (dias, nombres_id) como arreglos numpy
+        sobre el mmap
+    Métodos
+    -------
+    construir(cls, ruta, desde=1900, hasta=2100, provincias=None):
+        Calcula los feriados con VacacionesEcuador y escribe el índice
+    cubre(self, anio, prov):
+        Devuelve True si el índice contiene el año y la provincia
+    feriados(self, anio, prov):
+        Devuelve un arreglo booleano de 366 elementos indexado por día del año
+    mapa(self, anio, prov):
+        Devuelve el mapa de bits del año en el formato de CacheFeriados
+    nombre(self, fecha, prov):
+        Devuelve el nombre del feriado o None
+    verificar(self, anios=None):
+        Compara el índice con VacacionesEcuador y devuelve las diferencias
+    """
+    MAGIA = b'PYPFER\x00\x01'
+    FORMATO = 2
+    _CABECERA = struct.Struct('<8sHHhhHII')
+    _PROVINCIA = struct.Struct('<8sII')
+    # Índice distribuido junto a este módulo cuando se construye con --build-index
+    RUTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feriados_ecuador.idx')
+
+    def __init__(self, ruta):
         """
-        Establece el valor del atributo de la placa
+        Abre un índice existente con mmap
+
         Parámetros
         ----------
-        valor: str
-        
+        ruta : str
+
         aumenta
         ------
         ValorError
-            Si la cadena de valor no tiene el formato
-            XX-YYYY o XXX-YYYY,
-            donde X es una letra mayúscula e Y es un dígito
+            Si el archivo no es un índice válido o fue construido con otra versión de las reglas
         """
-        if not re.match('^[A-Z]{2,3}-[0-9]{4}$', valor):
-            raise ValueError(
-                'La placa debe tener el siguiente formato: XX-YYYY o XXX-YYYY, donde X es una letra mayúscula e Y es un dígito')
-        self._placa = valor
+        self.ruta = ruta
+        with open(ruta, 'rb') as archivo:
+            self._mm = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magia, formato, version, self.desde, self.hasta, n_prov, n_nombres,
+             n_feriados) = self._CABECERA.unpack_from(self._mm, 0)
+        except struct.error:
+            raise ValueError('Índice de feriados truncado: {}'.format(ruta)) from None
+        if magia != self.MAGIA or formato != self.FORMATO:
+            raise ValueError('{} no es un índice de feriados válido'.format(ruta))
+        if version != VacacionesEcuador.VERSION_REGLAS:
+            raise ValueError('El índice {} fue construido con otra versión de las reglas ({}); reconstrúyalo'.format(
+                ruta, version))
+        pos = self._CABECERA.size
+        tabla = []
+        for _ in range(n_prov):
+            codigo, inicio, cantidad = self._PROVINCIA.unpack_from(self._mm, pos)
+            tabla.append((codigo.rstrip(b'\x00').decode('ascii') or None, inicio, cantidad))
+            pos += self._PROVINCIA.size
+        dias = np.frombuffer(self._mm, dtype='<i4', count=n_feriados, offset=pos)
+        pos += 4 * n_feriados
+        nombres_id = np.frombuffer(self._mm, dtype='<u2', count=n_feriados, offset=pos)
+        pos += 2 * n_feriados
+        self._desplazamientos = np.frombuffer(self._mm, dtype='<u4', count=n_nombres + 1, offset=pos)
+        self._texto = pos + 4 * (n_nombres + 1)
+        self.provincias = {
+            codigo: (dias[inicio:inicio + cantidad], nombres_id[inicio:inicio + cantidad])
+            for codigo, inicio, cantidad in tabla}
 
+    @classmethod
+    def construir(cls, ruta, desde=1900, hasta=2100, provincias=None):
+        """
+        Calcula los feriados con VacacionesEcuador y escribe el índice de forma atómica,
+        con el calendario nacional además del de cada provincia
 
-    @property
-    def fecha(self):
-        """Tiene valor el atrivuto fecha"""
-        return self._fecha
+        Parámetros
+        ----------
+        ruta : str
+            archivo de destino
+        desde, hasta : int, opcional
+            rango de años incluido (el valor predeterminado es 1900 - 2100)
+        provincias : list de str, opcional
+            códigos de provincia (por defecto VacacionesEcuador.PROVINCIAS)
+        Devoluciones
+        -------
+        Devuelve el índice abierto
+        """
+        provincias = provincias or VacacionesEcuador.PROVINCIAS
+        anios = list(range(desde, hasta + 1))
+        nombres = {}
+        tabla, dias, nombres_id = [], [], []
+        for prov in [None] + list(provincias):
+            calendario = VacacionesEcuador(prov=prov, years=anios)
+            registros = sorted((f.toordinal() - _EPOCA, nombre) for f, nombre in calendario.items()
+                               if desde <= f.year <= hasta)
+            tabla.append((prov, len(dias), len(registros)))
+            for dia, nombre in registros:
+                dias.append(dia)
+                nombres_id.append(nombres.setdefault(nombre, len(nombres)))
+        textos = [n.encode('utf-8') for n in nombres]
+        desplazamientos = np.concatenate(([0], np.cumsum([len(t) for t in textos], dtype=np.int64)))
 
+        temporal = '{}.{}.tmp'.format(ruta, os.getpid())
+        with open(temporal, 'wb') as archivo:
+            archivo.write(cls._CABECERA.pack(cls.MAGIA, cls.FORMATO, VacacionesEcuador.VERSION_REGLAS, desde, hasta,
+                                             len(tabla), len(textos), len(dias)))
+            for prov, inicio, cantidad in tabla:
+                archivo.write(cls._PROVINCIA.pack((prov or '').encode('ascii'), inicio, cantidad))
+            archivo.write(np.asarray(dias, dtype='<i4').tobytes())
+            archivo.write(np.asarray(nombres_id, dtype='<u2').tobytes())
+            archivo.write(desplazamientos.astype('<u4').tobytes())
+            archivo.write(b''.join(textos))
+        os.replace(temporal, ruta)
+        return cls(ruta)
 
-    @fecha.setter
-    def fecha(self, valor):
+    @classmethod
+    def abrir(cls, ruta=None):
         """
-        Establece el valor del atributo de fecha
-        Parámetros
-        ----------
-        valor : str
-        
-        aumenta
-        ------
-        ValorError
-            Si la cadena de valor no tiene el formato AAAA-MM-DD (por ejemplo, 2021-04-02)
+        Abre el índice predeterminado ($PICO_PLACA_INDICE o el archivo junto al módulo)
+
+        Devoluciones
+        -------
+        Devuelve el índice, o None si no existe o no es válido
         """
+        ruta = ruta or os.environ.get('PICO_PLACA_INDICE') or cls.RUTA
         try:
-            if len(valor) != 10:
-                raise ValueError
-            datetime.datetime.strptime(valor, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError(
-                'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)') from None
-        self._date = valor
-        
+            return cls(ruta)
+        except (OSError, ValueError):
+            return None
 
-    @property
-    def tiempo(self):
-        """Tiene valor el atrivuto tiempo"""
-        return self._tiempo
+    def cubre(self, anio, prov):
+        """Devuelve True si el índice contiene el año y la provincia"""
+        return self.desde <= anio <= self.hasta and prov in self.provincias
 
+    def _rango(self, anio, prov):
+        """Devuelve los días y nombres_id de la provincia dentro del año"""
+        dias, nombres_id = self.provincias[prov]
+        inicio = datetime.date(anio, JAN, 1).toordinal() - _EPOCA
+        fin = datetime.date(anio, DEC, 31).toordinal() - _EPOCA
+        a, b = np.searchsorted(dias, [inicio, fin + 1])
+        return dias[a:b] - inicio, nombres_id[a:b]
 
-    @tiempo.setter
-    def tiempo(self, valor):
+    def feriados(self, anio, prov):
+        """Devuelve un arreglo booleano de 366 elementos indexado por día del año (0 = 1 de enero)"""
+        marcas = np.zeros(366, dtype=bool)
+        marcas[self._rango(anio, prov)[0]] = True
+        return marcas
+
+    def mapa(self, anio, prov):
+        """Devuelve el mapa de bits de feriados del año en el formato de CacheFeriados"""
+        return np.packbits(self.feriados(anio, prov), bitorder='little').tobytes()
+
+    def nombre(self, fecha, prov):
         """
-        Establece el valor del atributo de tiempo
+        Devuelve el nombre del feriado de la fecha en la provincia, o None si no es feriado
+
         Parámetros
         ----------
-        valor: str
-        
-        aumenta
-        ------
-        ValorError
-            Si la cadena de valor no tiene el formato HH:MM (por ejemplo, 08:31, 14:22, 00:01)
+        fecha : datetime.date
+        prov : str
+            código de provincia según ISO3166-2
         """
-        if not re.match('^([01][0-9]|2[0-3]):([0-5][0-9]|)$', valor):
-            raise ValueError(
-                'La hora debe tener el siguiente formato: HH:MM (por ejemplo, 08:31, 14:22, 00:01)')
-        self._tiempo = valor
+        dias, nombres_id = self.provincias[prov]
+        dia = fecha.toordinal() - _EPOCA
+        i = np.searchsorted(dias, dia)
+        if i == len(dias) or dias[i] != dia:
+            return None
+        n = int(nombres_id[i])
+        inicio = self._texto + int(self._desplazamientos[n])
+        fin = self._texto + int(self._desplazamientos[n + 1])
+        return self._mm[inicio:fin].decode('utf-8')
 
-
-    def __find_dia(self, fecha):
+    def verificar(self, anios=None):
         """
-        Encuentra el día a partir de la fecha: por ejemplo, miércoles
+        Compara el índice con VacacionesEcuador
+
         Parámetros
         ----------
-        fecha: str
-            Está siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
+        anios : iterable de int, opcional
+            años a comparar (por defecto todo el rango del índice)
         Devoluciones
         -------
-        Devuelve el día a partir de la fecha como una cadena
-        """        
-        d = datetime.datetime.strptime(fecha, '%Y-%m-%d').diaLab()
-        return self.__dias[d]
+        Devuelve una lista de tuplas (provincia, fecha, nombre en el índice, nombre en VacacionesEcuador)
+        con las diferencias; una lista vacía indica que el índice es correcto
+        """
+        anios = list(anios) if anios is not None else list(range(self.desde, self.hasta + 1))
+        diferencias = []
+        for prov in self.provincias:
+            calendario = VacacionesEcuador(prov=prov, years=anios)
+            esperados = {f: n for f, n in calendario.items() if f.year in anios}
+            for anio in anios:
+                dias, _ = self._rango(anio, prov)
+                inicio = datetime.date(anio, JAN, 1)
+                for dia in dias.tolist():
+                    fecha = inicio + datetime.timedelta(days=dia)
+                    nombre = self.nombre(fecha, prov)
+                    if esperados.pop(fecha, None) != nombre:
+                        diferencias.append((prov, fecha, nombre, calendario.get(fecha)))
+            diferencias.extend((prov, f, None, n) for f, n in sorted(esperados.items()))
+        return diferencias
+
+    def cerrar(self):
+        """Libera el mmap del índice"""
+        self.provincias = {}
+        self._desplazamientos = None
+        self._mm.close()
+
+
+class CacheFeriados:
+    """
+    Caché de calendarios de feriados compartida por todo el proceso.
+    Cada calendario se guarda como un mapa de bits de 366 bits (uno por día del año)
+    con clave (anio, provincia), con expulsión LRU acotada y segura entre hilos.
+    El calendario nacional (provincia None) se calcula una vez por año y los de cada provincia
+    se obtienen superponiéndole sus feriados propios.
+    ...
+    Atributos
+    ----------
+    capacidad : int
+        número máximo de calendarios (años por provincia) que se mantienen en memoria
+    aciertos : int
+        número de consultas resueltas desde la caché
+    fallos : int
+        número de consultas que requirieron calcular el calendario con VacacionesEcuador
+    Métodos
+    -------
+    mapa(self, anio, prov='EC-P'):
+        Devuelve el mapa de bits de feriados del año y provincia
+    feriados(self, anio, prov='EC-P'):
+        Devuelve un arreglo booleano de 366 elementos indexado por día del año (0 = 1 de enero)
+    es_feriado(self, fecha, prov='EC-P'):
+        Devuelve True si la fecha es feriado en la provincia
+    provincias(self, anio):
+        Devuelve una máscara de bits de provincias por día del año, para todas las provincias a la vez
+    provincias_feriado(self, fecha):
+        Devuelve la máscara de provincias en las que la fecha es feriado
+    estadisticas(self):
+        Devuelve un diccionario con aciertos, fallos, entradas y capacidad
+    limpiar(self):
+        Vacía la caché y reinicia las estadísticas
+    """
+    # 366 bits redondeados a bytes completos
+    BYTES_MAPA = 46
+
+    def __init__(self, capacidad=256, indice=True):
+        """
+        Construye una caché vacía.
+
+        Parámetros
+        ----------
+        capacidad : int, opcional
+            número máximo de calendarios en memoria (el valor predeterminado es 256)
+        indice : IndiceFeriados, str o bool, opcional
+            índice binario usado antes que VacacionesEcuador: un índice abierto, la ruta de un archivo,
+            True para abrir el índice predeterminado si existe, o False para no usar índice
+            (el valor predeterminado es True)
+        """
+        if capacidad < 1:
+            raise ValueError('La capacidad de la caché debe ser al menos 1')
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self._mapas = OrderedDict()
+        self._lock = threading.Lock()
+        self._indice = indice
 
+    def indice(self):
+        """Devuelve el índice binario de feriados en uso, abriéndolo en la primera llamada, o None"""
+        with self._lock:
+            if self._indice is True or isinstance(self._indice, str):
+                self._indice = IndiceFeriados.abrir(None if self._indice is True else self._indice)
+            return self._indice or None
 
-    def __is_forbidden_time(self, check_time):
+    def _construir(self, anio, prov):
         """
-        Comprueba si el tiempo proporcionado está dentro de las horas pico prohibidas,
-        donde las horas pico son: 07:00 - 09:30 y 16:00 - 19:30
+        Obtiene el mapa de bits de feriados de un año del índice binario o, si no lo cubre, con VacacionesEcuador
+
         Parámetros
         ----------
-        verificarHora : str
-            Tiempo que se comprobará. Está en formato HH:MM: por ejemplo, 08:35, 19:15
+        anio : int
+        prov : str o None
+            código de provincia según ISO3166-2, o None para el calendario nacional
         Devoluciones
         -------
-        Devuelve True si el tiempo proporcionado está dentro de las horas pico prohibidas, de lo contrario, False
-        """           
-        t = datetime.datetime.strptime(check_time, '%H:%M').time()
-        return ((t >= datetime.time(7, 0) and t <= datetime.time(9, 30)) or
-                (t >= datetime.time(16, 0) and t <= datetime.time(19, 30)))
-
+        Devuelve el mapa de bits como bytes
+        """
+        indice = self.indice()
+        if indice is not None and indice.cubre(anio, prov):
+            return indice.mapa(anio, prov)
+        if prov is None:
+            bits = bytearray(self.BYTES_MAPA)
+            feriados = VacacionesEcuador.nacionales(anio)
+        else:
+            # Los feriados de la provincia se superponen al calendario nacional ya calculado
+            bits = bytearray(self.mapa(anio, None))
+            feriados = VacacionesEcuador.provinciales(anio, prov)
+        inicio = datetime.date(anio, JAN, 1).toordinal()
+        for fecha, _ in feriados:
+            if fecha.year == anio:
+                dia = fecha.toordinal() - inicio
+                bits[dia >> 3] |= 1 << (dia & 7)
+        return bytes(bits)
 
-    def __is_holiday(self, fecha, online):
+    def mapa(self, anio, prov='EC-P'):
         """
-        Comprueba si la fecha (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador
-        si en línea == Verdadero, utilizará una API REST, de lo contrario, generará los días festivos del año examinado
-        
+        Devuelve el mapa de bits de feriados del año y provincia, calculándolo si no está en la caché
+
         Parámetros
         ----------
-        fecha: str
-            Está siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
-        en línea: booleano, opcional
-            si online == Verdadero, se utilizará la API de días festivos abstractos
+        anio : int
+        prov : str o None, opcional
+            código de provincia según ISO3166-2, o None para el calendario nacional (el valor predeterminado es 'EC-P')
         Devoluciones
         -------
-        Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, False
-        """            
-        y, m, d = fecha.split('-')
+        Devuelve bytes donde el bit (dia & 7) del byte (dia >> 3) indica si el día del año es feriado
+        """
+        clave = (anio, prov)
+        with self._lock:
+            mapa = self._mapas.get(clave)
+            if mapa is not None:
+                self._mapas.move_to_end(clave)
+                self.aciertos += 1
+                return mapa
+            self.fallos += 1
+        # El cálculo se hace fuera del candado para no bloquear a otros hilos
+        mapa = self._construir(anio, prov)
+        with self._lock:
+            self._mapas[clave] = mapa
+            self._mapas.move_to_end(clave)
+            while len(self._mapas) > self.capacidad:
+                self._mapas.popitem(last=False)
+        return mapa
 
-        if online:
-            #API de vacaciones abstractapi, versión gratuita: 1000 solicitudes por mes
-            #1 solicitud por segundo
-            #recuperar la clave API de la variable de entorno
-            key = os.environ.get('HOLIDAYS_API_KEY')
-            response = requests.get(
-                "https://holidays.abstractapi.com/v1/?api_key={}&country=EC&year={}&month={}&dia={}".format(key, y, m, d))
-            if (response.status_code == 401):
-                # Esto significa que falta una clave API
-                raise requests.HTTPError(
-                    'Missing API key. Store your key in the enviroment variable HOLIDAYS_API_KEY')
-            if response.content == b'[]':  # si no hay vacaciones, obtenemos una matriz vacía
-                return False
-            # Arreglar el Jueves Santo incorrectamente denotado como feriado
-            if json.loads(response.text[1:-1])['name'] == 'Maundy Thursday':
-                return False
-            return True
-        else:
-            ecu_holidays = VacacionesEcuador(prov='EC-P')
-            return fecha in ecu_holidays
+    def feriados(self, anio, prov='EC-P'):
+        """
+        Devuelve un arreglo booleano de 366 elementos indexado por día del año (0 = 1 de enero)
 
+        Parámetros
+        ----------
+        anio : int
+        prov : str, opcional
+            código de provincia según ISO3166-2 (el valor predeterminado es 'EC-P')
+        """
+        bits = np.unpackbits(np.frombuffer(self.mapa(anio, prov), dtype=np.uint8), bitorder='little')
+        return bits[:366].astype(bool)
 
-    def predecir(self):
+    def es_feriado(self, fecha, prov='EC-P'):
         """
-        Comprueba si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora proporcionada según las reglas de Pico y Placa:
-        http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+        Comprueba si una fecha es feriado
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        prov : str, opcional
+            código de provincia según ISO3166-2 (el valor predeterminado es 'EC-P')
         Devoluciones
         -------
+        Devuelve True si la fecha es feriado, de lo contrario False
+        """
+        dia = fecha.timetuple().tm_yday - 1
+        return bool(self.mapa(fecha.year, prov)[dia >> 3] >> (dia & 7) & 1)
+
+    def provincias(self, anio):
+        """
+        Devuelve en una sola consulta los feriados del año en todas las provincias
+
+        Parámetros
+        ----------
+        anio : int
         Devoluciones
-        Verdadero si el vehículo con
-        la placa especificada puede estar en el camino
-        en la fecha y hora especificadas, de lo contrario Falso
+        -------
+        Devuelve un arreglo uint32 de solo lectura de 366 elementos indexado por día del año, donde el bit i
+        indica si el día es feriado en VacacionesEcuador.PROVINCIAS[i] (ver VacacionesEcuador.decodificar_provincias)
         """
-        # Comprobar si la fecha es un día festivo
-        if self.__is_holiday(self.fecha, self.online):
-            return True
+        clave = (anio, '*')
+        with self._lock:
+            mascaras = self._mapas.get(clave)
+            if mascaras is not None:
+                self._mapas.move_to_end(clave)
+                self.aciertos += 1
+                return mascaras
+            self.fallos += 1
+        indice = self.indice()
+        if indice is not None and all(indice.cubre(anio, prov) for prov in VacacionesEcuador.PROVINCIAS):
+            mascaras = np.zeros(366, dtype=np.uint32)
+            for i, prov in enumerate(VacacionesEcuador.PROVINCIAS):
+                mascaras[indice.feriados(anio, prov)] |= np.uint32(1 << i)
+        else:
+            # Los feriados nacionales marcan todas las provincias; cada provincia añade solo sus feriados propios
+            mascaras = np.where(self.feriados(anio, None), np.uint32((1 << len(VacacionesEcuador.PROVINCIAS)) - 1),
+                                np.uint32(0))
+            inicio = datetime.date(anio, JAN, 1).toordinal()
+            for i, prov in enumerate(VacacionesEcuador.PROVINCIAS):
+                for fecha, _ in VacacionesEcuador.provinciales(anio, prov):
+                    if fecha.year == anio:
+                        mascaras[fecha.toordinal() - inicio] |= np.uint32(1 << i)
+        mascaras.flags.writeable = False
+        with self._lock:
+            self._mapas[clave] = mascaras
+            self._mapas.move_to_end(clave)
+            while len(self._mapas) > self.capacidad:
+                self._mapas.popitem(last=False)
+        return mascaras
 
-        # Consultar vehículos excluidos de la restricción según la segunda letra de la placa o si se utilizan sólo dos letras
-        # https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
-        if self.placa[1] in 'AUZEXM' or len(self.placa.split('-')[0]) == 2:
-            return True
+    def provincias_feriado(self, fecha):
+        """
+        Devuelve la máscara de provincias en las que la fecha es feriado (bit i = VacacionesEcuador.PROVINCIAS[i])
 
-        # Compruebe si el tiempo proporcionado no está en las horas pico prohibidas
-        if not self.__is_forbidden_time(self.tiempo):
-            return True
+        Parámetros
+        ----------
+        fecha : datetime.date
+        """
+        return int(self.provincias(fecha.year)[fecha.timetuple().tm_yday - 1])
 
-        dia = self.__find_dia(self.fecha)  # Buscar el día de la semana a partir de la fecha
-        # Verifique si el último dígito de la placa no está restringido en este día en particular
-        if int(self.placa[-1]) not in self.__restricciones[dia]:
-            return True
+    def estadisticas(self):
+        """Devuelve un diccionario con aciertos, fallos, entradas y capacidad de la caché"""
+        with self._lock:
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'entradas': len(self._mapas),
+                'capacidad': self.capacidad}
 
-        return False
+    def limpiar(self):
+        """Vacía la caché y reinicia las estadísticas"""
+        with self._lock:
+            self._mapas.clear()
+            self.aciertos = 0
+            self.fallos = 0
 
 
-if __name__ == '__main__':
+# Caché de feriados compartida por todas las instancias de PicoPlaca del proceso
+CACHE_FERIADOS = CacheFeriados()
 
-    parser = argparse.ArgumentParser(
-        description='Predictor Pico y Placa Quito: Verifique si el vehículo con la placa proporcionada puede estar en la carretera en la fecha y hora proporcionada')
-    parser.add_argument(
-        '-o',
-        '--online',
-        action='store_true',
-        help='use abstract\'s Public Holidays API')
-    parser.add_argument(
-        '-p',
-        '--plate',
-        required=True,
-        help='la placa del vehículo: XXX-YYYY o XX-YYYY, donde X es una letra mayúscula e Y es un dígito')
+
+class LimitadorTasa:
+    """
+    Limitador de tasa de tipo cubeta de fichas (token bucket), seguro entre hilos.
+    ...
+    Atributos
+    ----------
+    tasa : float
+        fichas repuestas por segundo
+    capacidad : int
+        número máximo de fichas acumuladas (tamaño de ráfaga)
+    Métodos
+    -------
+    adquirir(self):
+        Espera hasta que haya una ficha disponible y la consume
+    """
+
+    def __init__(self, tasa=1.0, capacidad=1):
+        """
+        Construye un limitador con la cubeta llena.
+
+        Parámetros
+        ----------
+        tasa : float, opcional
+            fichas por segundo (el valor predeterminado es 1.0, el límite de la API gratuita)
+        capacidad : int, opcional
+            tamaño máximo de ráfaga (el valor predeterminado es 1)
+        """
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._fichas = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Espera hasta que haya una ficha disponible y la consume"""
+        with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                time.sleep((1 - self._fichas) / self.tasa)
+
+
+class Interruptor:
+    """
+    Interruptor de circuito (circuit breaker) seguro entre hilos: se abre tras varios fallos consecutivos
+    y, pasado el tiempo de enfriamiento, deja pasar una sola prueba antes de cerrarse de nuevo.
+    ...
+    Atributos
+    ----------
+    fallos_apertura : int
+        fallos consecutivos que abren el interruptor
+    enfriamiento : float
+        segundos que el interruptor permanece abierto antes de permitir una prueba
+    Métodos
+    -------
+    permitir(self):
+        Devuelve True si se puede intentar la operación
+    exito(self):
+        Registra una operación correcta y cierra el interruptor
+    fallo(self):
+        Registra una operación fallida
+    estado(self):
+        Devuelve 'cerrado', 'abierto' o 'semiabierto'
+    """
+
+    def __init__(self, fallos_apertura=5, enfriamiento=30.0):
+        """
+        Construye un interruptor cerrado.
+
+        Parámetros
+        ----------
+        fallos_apertura : int, opcional
+            fallos consecutivos que abren el interruptor (el valor predeterminado es 5)
+        enfriamiento : float, opcional
+            segundos abierto antes de permitir una prueba (el valor predeterminado es 30)
+        """
+        self.fallos_apertura = fallos_apertura
+        self.enfriamiento = enfriamiento
+        self._fallos = 0
+        self._abierto_desde = None
+        self._probando = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """Devuelve True si se puede intentar la operación; con el interruptor semiabierto solo pasa una prueba"""
+        with self._lock:
+            if self._abierto_desde is None:
+                return True
+            if self._probando or time.monotonic() - self._abierto_desde < self.enfriamiento:
+                return False
+            self._probando = True
+            return True
+
+    def exito(self):
+        """Registra una operación correcta: reinicia los fallos y cierra el interruptor"""
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._probando = False
+
+    def fallo(self):
+        """Registra una operación fallida; abre (o vuelve a abrir) el interruptor si corresponde"""
+        with self._lock:
+            self._fallos += 1
+            if self._probando or self._fallos >= self.fallos_apertura:
+                if self._abierto_desde is None and METRICAS.activo:
+                    METRICAS.contar('api_interruptor_aperturas')
+                self._abierto_desde = time.monotonic()
+                self._probando = False
+
+    def estado(self):
+        """Devuelve 'cerrado', 'abierto' o 'semiabierto'"""
+        with self._lock:
+            if self._abierto_desde is None:
+                return 'cerrado'
+            if self._probando or time.monotonic() - self._abierto_desde >= self.enfriamiento:
+                return 'semiabierto'
+            return 'abierto'
+
+
+class ClienteFeriados:
+    """
+    Cliente de la API de días festivos de abstractapi con conexiones reutilizables,
+    límite de tasa y caché persistente en disco.
+    Cada solicitud HTTP tiene un plazo máximo, que empieza a contar cuando el límite de tasa la deja pasar:
+    si la API no responde a tiempo, falla o el interruptor está abierto, la respuesta se obtiene del calendario
+    local (CACHE_FERIADOS) mientras la solicitud, si se hizo, termina en segundo plano y guarda su resultado
+    en la caché en disco. Nunca hay más de conexiones solicitudes en curso o pendientes.
+    ...
+    Atributos
+    ----------
+    pais : str
+        código de país ISO 3166-1 alfa-2 consultado
+    ttl : float
+        segundos durante los que una respuesta guardada en disco se considera válida
+    ruta_cache : str
+        ruta del archivo SQLite con las respuestas guardadas
+    tiempo_espera : float
+        segundos máximos de conexión y de lectura de cada solicitud HTTP
+    plazo : float o None
+        segundos máximos que espera la respuesta de una solicitud, sin contar la espera del límite de tasa,
+        antes de usar el respaldo
+    respaldo : bool
+        si se usa el calendario local cuando la API no responde a tiempo o falla
+    interruptor : Interruptor
+        interruptor de circuito de la API
+    Métodos
+    -------
+    consultar(self, fecha):
+        Devuelve (es_feriado, fuente), donde fuente indica si respondió la caché, la API o el respaldo local
+    es_feriado(self, fecha):
+        Devuelve True si la fecha es feriado según la API (o la caché en disco o el respaldo local)
+    consultar_async(self, fecha):
+        Versión asyncio de consultar con concurrencia acotada y consultas idénticas agrupadas
+    es_feriado_async(self, fecha):
+        Versión asyncio de es_feriado
+    precargar(self, anio, en_segundo_plano=True, reintentos=3, espera=1.0, errores=None):
+        Consulta los días del año que no estén en la caché, con reintentos; en segundo plano devuelve un Future
+    cerrar(self):
+        Cierra la sesión HTTP y la base de datos de la caché
+    """
+    URL = "https://holidays.abstractapi.com/v1/"
+
+    # Fuentes posibles de una respuesta de consultar()
+    FUENTES = ('cache', 'api', 'respaldo')
+
+    def __init__(self, api_key=None, pais='EC', tasa=1.0, rafaga=1, ttl=180 * 24 * 3600, ruta_cache=None, conexiones=4,
+                 concurrencia=None, tiempo_espera=5.0, plazo=2.0, respaldo=True, fallos_apertura=5, enfriamiento=30.0):
+        """
+        Construye el cliente. La sesión HTTP y la base de datos se abren en la primera consulta.
+
+        Parámetros
+        ----------
+        api_key : str, opcional
+            clave de la API; si es None se lee de la variable de entorno HOLIDAYS_API_KEY en cada consulta
+        pais : str, opcional
+            código de país (el valor predeterminado es 'EC')
+        tasa : float, opcional
+            solicitudes por segundo permitidas (el valor predeterminado es 1.0)
+        rafaga : int, opcional
+            solicitudes que pueden hacerse seguidas sin esperar (el valor predeterminado es 1)
+        ttl : float, opcional
+            vigencia en segundos de las respuestas guardadas (el valor predeterminado es 180 días)
+        ruta_cache : str, opcional
+            archivo SQLite de la caché; por defecto $PICO_PLACA_CACHE o ~/.cache/pico_placa/feriados.sqlite3
+        conexiones : int, opcional
+            tamaño del grupo de conexiones keep-alive (el valor predeterminado es 4)
+        concurrencia : int, opcional
+            consultas simultáneas permitidas en el modo asyncio (por defecto igual a conexiones)
+        tiempo_espera : float, opcional
+            segundos máximos de conexión y de lectura de cada solicitud HTTP (el valor predeterminado es 5)
+        plazo : float o None, opcional
+            segundos máximos de espera de cada solicitud, contados desde que el límite de tasa la deja pasar,
+            antes de usar el respaldo; None espera la respuesta de la API (el valor predeterminado es 2)
+        respaldo : booleano, opcional
+            si es Verdadero, usa el calendario local cuando la API no responde a tiempo o falla; si es Falso,
+            propaga el error (el valor predeterminado es Verdadero)
+        fallos_apertura : int, opcional
+            fallos consecutivos de la API que abren el interruptor (el valor predeterminado es 5)
+        enfriamiento : float, opcional
+            segundos sin consultar la API tras abrirse el interruptor (el valor predeterminado es 30)
+        """
+        self.api_key = api_key
+        self.pais = pais
+        self.ttl = ttl
+        self.ruta_cache = ruta_cache or os.environ.get('PICO_PLACA_CACHE') or os.path.join(
+            os.path.expanduser('~'), '.cache', 'pico_placa', 'feriados.sqlite3')
+        self.limitador = LimitadorTasa(tasa, rafaga)
+        self._conexiones = conexiones
+        self.concurrencia = concurrencia or conexiones
+        self.tiempo_espera = tiempo_espera
+        self.plazo = plazo
+        self.respaldo = respaldo
+        self.interruptor = Interruptor(fallos_apertura, enfriamiento)
+        self._sesion = None
+        self._db = None
+        self._ejecutor = None
+        self._precargas = set()
+        # Huecos para solicitudes en segundo plano: acota las solicitudes vencidas que siguen en curso
+        self._pendientes = threading.BoundedSemaphore(conexiones)
+        self._lock = threading.Lock()
+        # Estado asyncio (semáforo y consultas en curso) del último bucle de eventos usado
+        self._bucle = None
+        self._semaforo = None
+        self._en_curso = {}
+
+    def _abrir(self):
+        """Abre la sesión HTTP y la base de datos de la caché si aún no están abiertas"""
+        with self._lock:
+            if self._sesion is None:
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self._conexiones)
+                sesion.mount('https://', adaptador)
+                self._sesion = sesion
+            if self._ejecutor is None:
+                self._ejecutor = concurrent.futures.ThreadPoolExecutor(
+                    self._conexiones, thread_name_prefix='api-feriados')
+            if self._db is None:
+                directorio = os.path.dirname(self.ruta_cache)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                db = sqlite3.connect(self.ruta_cache, timeout=30, check_same_thread=False)
+                db.execute(
+                    'CREATE TABLE IF NOT EXISTS feriados ('
+                    'pais TEXT, anio INTEGER, mes INTEGER, dia INTEGER, respuesta TEXT, guardado REAL, '
+                    'PRIMARY KEY (pais, anio, mes, dia))')
+                db.commit()
+                self._db = db
+
+    def _leer_cache(self, fecha):
+        """Devuelve la respuesta guardada para la fecha, o None si no existe o venció"""
+        with self._lock:
+            fila = self._db.execute(
+                'SELECT respuesta, guardado FROM feriados WHERE pais=? AND anio=? AND mes=? AND dia=?',
+                (self.pais, fecha.year, fecha.month, fecha.day)).fetchone()
+        if fila is None or time.time() - fila[1] > self.ttl:
+            return None
+        return fila[0]
+
+    def _guardar_cache(self, fecha, respuesta):
+        """Guarda la respuesta de la API para la fecha"""
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO feriados VALUES (?, ?, ?, ?, ?, ?)',
+                (self.pais, fecha.year, fecha.month, fecha.day, respuesta, time.time()))
+            self._db.commit()
+
+    def _clave(self):
+        """
+        Devuelve la clave de la API
+
+        aumenta
+        ------
+        requests.HTTPError
+            Si falta la clave de la API: es un error de configuración, no una falla de la API
+        """
+        key = self.api_key or os.environ.get('HOLIDAYS_API_KEY')
+        if not key:
+            raise requests.HTTPError('Missing API key. Store your key in the enviroment variable HOLIDAYS_API_KEY')
+        return key
+
+    def _solicitar(self, fecha):
+        """
+        Consulta la API para una fecha; quien llama debe haber obtenido antes una ficha del límite de tasa
+
+        Devoluciones
+        -------
+        Devuelve el cuerpo de la respuesta (una lista JSON de feriados)
+
+        aumenta
+        ------
+        requests.HTTPError
+            Si falta la clave de la API o la API responde con un error
+        """
+        key = self.api_key or os.environ.get('HOLIDAYS_API_KEY')
+        inicio = time.perf_counter()
+        response = self._sesion.get(self.URL, params={
+            'api_key': key, 'country': self.pais, 'year': fecha.year, 'month': fecha.month, 'day': fecha.day},
+            timeout=self.tiempo_espera)
+        if METRICAS.activo:
+            METRICAS.observar('api_latencia', time.perf_counter() - inicio)
+            METRICAS.contar('api_respuestas', str(response.status_code))
+        if response.status_code == 401:
+            # Esto significa que falta una clave API
+            raise requests.HTTPError(
+                'Missing API key. Store your key in the enviroment variable HOLIDAYS_API_KEY')
+        response.raise_for_status()
+        return response.text
+
+    def respuesta(self, fecha):
+        """
+        Devuelve la lista de feriados que la API informa para la fecha, usando la caché en disco,
+        con el mismo límite de tasa, interruptor y plazo que consultar() pero sin respaldo local
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        Devoluciones
+        -------
+        Devuelve el cuerpo JSON de la respuesta como cadena
+
+        aumenta
+        ------
+        requests.RequestException
+            Si falta la clave de la API, la API falla o no responde a tiempo, o el interruptor está abierto
+        """
+        texto = self._texto_cache(fecha)
+        if texto is None:
+            self._clave()
+            texto = self._pedir_api(fecha, self.plazo)
+        return texto
+
+    @staticmethod
+    def _interpretar(texto):
+        """
+        Devuelve True si la respuesta de la API contiene algún feriado
+
+        aumenta
+        ------
+        ValorError
+            Si la respuesta no es una lista JSON de objetos (por ejemplo, un objeto de error con estado 200)
+        """
+        feriados = json.loads(texto)
+        if not isinstance(feriados, list) or not all(isinstance(f, dict) for f in feriados):
+            raise ValueError('Respuesta inesperada de la API de feriados: {:.200}'.format(texto))
+        # si no hay vacaciones, obtenemos una matriz vacía
+        # Arreglar el Jueves Santo incorrectamente denotado como feriado
+        return any(f.get('name') != 'Maundy Thursday' for f in feriados)
+
+    def _actualizar(self, fecha):
+        """Consulta la API, comprueba la respuesta y la guarda en la caché en disco"""
+        texto = self._solicitar(fecha)
+        self._interpretar(texto)
+        self._guardar_cache(fecha, texto)
+        return texto
+
+    def _pedir_api(self, fecha, plazo):
+        """
+        Consulta la API para una fecha: espera una ficha del límite de tasa y luego, como mucho plazo segundos,
+        la respuesta de la solicitud. Si todas las solicitudes permitidas siguen en curso, no envía otra.
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        plazo : float o None
+            segundos máximos de espera de la respuesta; con None la solicitud se hace en el hilo actual
+            sin ocupar un hueco de las solicitudes en segundo plano
+        Devoluciones
+        -------
+        Devuelve el cuerpo JSON de la respuesta como cadena
+
+        aumenta
+        ------
+        requests.ConnectionError
+            Si el interruptor está abierto o no quedan huecos para solicitudes en segundo plano
+        requests.Timeout
+            Si la API no responde dentro del plazo; la solicitud termina en segundo plano
+        requests.RequestException
+            Si la API falla
+        """
+        if plazo is not None and not self._pendientes.acquire(blocking=False):
+            raise requests.ConnectionError('Todas las solicitudes a la API de feriados siguen en curso')
+        try:
+            if not self.interruptor.permitir():
+                raise requests.ConnectionError('Interruptor de la API de feriados abierto')
+            self.limitador.adquirir()
+            futuro = None if plazo is None else self._ejecutor.submit(self._actualizar, fecha)
+        except BaseException:
+            if plazo is not None:
+                self._pendientes.release()
+            raise
+        # El interruptor cuenta el resultado visto dentro del plazo: una respuesta tardía es un fallo aunque
+        # la solicitud termine después y guarde su respuesta en la caché en disco
+        try:
+            if futuro is None:
+                texto = self._actualizar(fecha)
+            else:
+                # El hueco se libera cuando la solicitud termina o se cancela, aunque haya vencido el plazo
+                futuro.add_done_callback(lambda _: self._pendientes.release())
+                try:
+                    texto = futuro.result(timeout=plazo)
+                except concurrent.futures.TimeoutError:
+                    raise requests.Timeout('La API de feriados no respondió en {} s'.format(plazo)) from None
+        except (requests.RequestException, ValueError):
+            self.interruptor.fallo()
+            raise
+        self.interruptor.exito()
+        return texto
+
+    @staticmethod
+    def _transitorio(error):
+        """Devuelve True si el error de la API puede desaparecer al reintentar (red, plazo, interruptor, 429 o 5xx)"""
+        if isinstance(error, requests.HTTPError):
+            estado = getattr(error.response, 'status_code', None)
+            return estado is not None and (estado == 429 or estado >= 500)
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def _texto_cache(self, fecha):
+        """Devuelve la respuesta vigente en la caché en disco para la fecha, o None; cuenta el acierto o el fallo"""
+        self._abrir()
+        texto = self._leer_cache(fecha)
+        if METRICAS.activo:
+            METRICAS.contar('api_cache', 'fallo' if texto is None else 'acierto')
+        return texto
+
+    def _consultar_cache(self, fecha):
+        """Devuelve (es_feriado, 'cache') si la fecha está vigente en la caché en disco, o None"""
+        texto = self._texto_cache(fecha)
+        return None if texto is None else (self._interpretar(texto), 'cache')
+
+    def _consultar_api(self, fecha):
+        """Consulta la API para una fecha que no está en la caché en disco, con el respaldo local (ver consultar())"""
+        self._clave()
+        try:
+            return self._interpretar(self._pedir_api(fecha, self.plazo)), 'api'
+        except (requests.RequestException, ValueError):
+            if not self.respaldo:
+                raise
+            return CACHE_FERIADOS.es_feriado(fecha), 'respaldo'
+
+    @staticmethod
+    def _registrar_fuente(resultado):
+        """Cuenta la fuente de una respuesta de consultar() en METRICAS y devuelve la respuesta"""
+        if METRICAS.activo:
+            METRICAS.contar('feriados_fuente', resultado[1])
+        return resultado
+
+    def consultar(self, fecha):
+        """
+        Comprueba si una fecha es feriado según la API, sin esperar más que plazo segundos
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        Devoluciones
+        -------
+        Devuelve una tupla (es_feriado, fuente), donde fuente es 'cache' (caché en disco), 'api'
+        o 'respaldo' (calendario local, porque la API no respondió a tiempo, falló o el interruptor está abierto)
+
+        aumenta
+        ------
+        requests.HTTPError
+            Si falta la clave de la API y la fecha no está en la caché en disco
+        requests.RequestException
+            Si la API falla y respaldo es Falso
+        """
+        return self._registrar_fuente(self._consultar_cache(fecha) or self._consultar_api(fecha))
+
+    def es_feriado(self, fecha):
+        """
+        Comprueba si una fecha es feriado según la API (ver consultar())
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        Devoluciones
+        -------
+        Devuelve True si la fecha es feriado, de lo contrario False
+        """
+        return self.consultar(fecha)[0]
+
+    def _estado_async(self):
+        """Devuelve el semáforo y el diccionario de consultas en curso del bucle de eventos actual"""
+        bucle = asyncio.get_running_loop()
+        if self._bucle is not bucle:
+            self._bucle = bucle
+            self._semaforo = asyncio.Semaphore(self.concurrencia)
+            self._en_curso = {}
+        return self._semaforo, self._en_curso
+
+    async def _consultar_async(self, fecha, semaforo):
+        """
+        Lee la caché en disco y, si la fecha no está, consulta la API sin exceder la concurrencia permitida;
+        ambas cosas en hilos, porque abrir y leer la base de datos bloquea
+        """
+        resultado = await asyncio.to_thread(self._consultar_cache, fecha)
+        if resultado is not None:
+            return resultado
+        async with semaforo:
+            return await asyncio.to_thread(self._consultar_api, fecha)
+
+    async def consultar_async(self, fecha):
+        """
+        Versión asyncio de consultar() que no bloquea el bucle de eventos: la caché en disco y la API
+        se consultan en hilos. Las consultas simultáneas de la misma fecha se agrupan en una sola lectura
+        de la caché y una sola solicitud, y las respuestas se comparten a través de la caché en disco.
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        Devoluciones
+        -------
+        Devuelve una tupla (es_feriado, fuente) como consultar()
+        """
+        semaforo, en_curso = self._estado_async()
+        tarea = en_curso.get(fecha)
+        if tarea is None:
+            tarea = asyncio.ensure_future(self._consultar_async(fecha, semaforo))
+            en_curso[fecha] = tarea
+            tarea.add_done_callback(lambda _: en_curso.pop(fecha, None))
+        # shield evita que la cancelación de un solicitante cancele la consulta compartida
+        return self._registrar_fuente(await asyncio.shield(tarea))
+
+    async def es_feriado_async(self, fecha):
+        """
+        Comprueba si una fecha es feriado según la API sin bloquear el bucle de eventos (ver consultar_async())
+
+        Parámetros
+        ----------
+        fecha : datetime.date
+        Devoluciones
+        -------
+        Devuelve True si la fecha es feriado, de lo contrario False
+        """
+        return (await self.consultar_async(fecha))[0]
+
+    def precargar(self, anio, en_segundo_plano=True, reintentos=3, espera=1.0, errores=None):
+        """
+        Consulta todos los días del año que no estén en la caché en disco, con el mismo límite de tasa
+        e interruptor que consultar(), pero sin plazo: cada solicitud espera la respuesta de la API.
+        Los errores transitorios (red, tiempo de espera, 429 o 5xx) se reintentan con espera exponencial
+        y, si persisten, la fecha se omite; mientras el interruptor está abierto la precarga espera.
+
+        Parámetros
+        ----------
+        anio : int
+        en_segundo_plano : booleano, opcional
+            si es Verdadero la precarga se hace en un hilo demonio (el valor predeterminado es Verdadero)
+        reintentos : int, opcional
+            reintentos de cada fecha tras un error transitorio (el valor predeterminado es 3)
+        espera : float, opcional
+            segundos antes del primer reintento, que se duplican en cada uno (el valor predeterminado es 1)
+        errores : list, opcional
+            si se indica, recibe tuplas (fecha, excepción) de las fechas omitidas
+        Devoluciones
+        -------
+        En segundo plano, devuelve un concurrent.futures.Future con el número de días consultados a la API
+        o con la excepción que detuvo la precarga; cancel() o cerrar() la detienen antes de la siguiente fecha.
+        En el hilo actual, devuelve directamente el número de días consultados.
+
+        aumenta
+        ------
+        requests.RequestException
+            En el hilo actual, si falta la clave de la API o la API la rechaza (errores 4xx distintos de 429)
+        """
+        # El future queda pendiente mientras dura la precarga para que cancel() pueda detenerla
+        futuro = concurrent.futures.Future()
+
+        def dormir(segundos):
+            """Espera los segundos indicados, o menos si la precarga se cancela"""
+            limite = time.monotonic() + segundos
+            while not futuro.cancelled() and time.monotonic() < limite:
+                time.sleep(max(0.0, min(0.1, limite - time.monotonic())))
+
+        def consultar(fecha):
+            """Consulta la fecha con reintentos; devuelve True si la API respondió, o False si se omitió"""
+            for intento in range(reintentos + 1):
+                if intento:
+                    dormir(espera * 2 ** (intento - 1))
+                # Un interruptor abierto no gasta reintentos: se espera a que deje pasar una prueba
+                while self.interruptor.estado() == 'abierto' and not futuro.cancelled():
+                    dormir(0.1)
+                if futuro.cancelled():
+                    return False
+                try:
+                    self._pedir_api(fecha, None)
+                    return True
+                except ValueError as error:
+                    # La respuesta no es una lista de feriados: reintentar no la cambia
+                    fallo = error
+                    break
+                except requests.RequestException as error:
+                    if not self._transitorio(error):
+                        raise
+                    fallo = error
+            if errores is not None:
+                errores.append((fecha, fallo))
+            return False
+
+        def tarea():
+            self._clave()
+            consultados = 0
+            fecha = datetime.date(anio, JAN, 1)
+            while fecha.year == anio and not futuro.cancelled():
+                if self._texto_cache(fecha) is None and consultar(fecha):
+                    consultados += 1
+                fecha += datetime.timedelta(days=1)
+            return consultados
+
+        if not en_segundo_plano:
+            return tarea()
+
+        def ejecutar():
+            try:
+                resultado, error = tarea(), None
+            except Exception as excepcion:
+                resultado, error = None, excepcion
+            with self._lock:
+                self._precargas.discard(futuro)
+            try:
+                if error is None:
+                    futuro.set_result(resultado)
+                else:
+                    futuro.set_exception(error)
+            except concurrent.futures.InvalidStateError:
+                # La precarga fue cancelada
+                pass
+
+        with self._lock:
+            self._precargas.add(futuro)
+        threading.Thread(target=ejecutar, name='precarga-feriados-{}'.format(anio), daemon=True).start()
+        return futuro
+
+    def cerrar(self):
+        """
+        Cierra la sesión HTTP y la base de datos de la caché, cancela las solicitudes que no han empezado
+        y detiene las precargas en curso
+        """
+        with self._lock:
+            for futuro in self._precargas:
+                futuro.cancel()
+            self._precargas.clear()
+            if self._ejecutor is not None:
+                self._ejecutor.shutdown(wait=False, cancel_futures=True)
+                self._ejecutor = None
+            if self._sesion is not None:
+                self._sesion.close()
+                self._sesion = None
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Cliente de la API de feriados compartido por todas las instancias de PicoPlaca del proceso.
+# API de vacaciones abstractapi, versión gratuita: 1000 solicitudes por mes, 1 solicitud por segundo
+CLIENTE_FERIADOS = ClienteFeriados()
+atexit.register(lambda: CLIENTE_FERIADOS.cerrar())
+
+
+# Patrones de los setters de PicoPlaca, compilados una sola vez (se aplican con fullmatch)
+_PATRON_PLACA = re.compile('[A-Z]{2,3}-[0-9]{4}')
+_PATRON_FECHA = re.compile('([0-9]{4})-([0-9]{2})-([0-9]{2})')
+_PATRON_TIEMPO = re.compile('([01][0-9]|2[0-3]):([0-5][0-9])')
+# Puntos de código Unicode usados por los analizadores vectorizados
+_GUION, _DOS_PUNTOS, _CERO, _A = ord('-'), ord(':'), ord('0'), ord('A')
+# Ordinal de 1970-01-01: los días se representan como días desde esta fecha (compatible con datetime64[D])
+_EPOCA = datetime.date(1970, 1, 1).toordinal()
+# Días de cada mes en un año no bisiesto (índice 0 sin uso)
+_DIAS_MES = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int32)
+
+
+def _validar_placa(placa):
+    """
+    Comprueba el formato de una placa y la devuelve sin cambios
+
+    aumenta
+    ------
+    ValorError
+        Si la placa no tiene el formato XX-YYYY o XXX-YYYY, donde X es una letra mayúscula e Y es un dígito
+    """
+    if not _PATRON_PLACA.fullmatch(placa):
+        raise ValueError(
+            'La placa debe tener el siguiente formato: XX-YYYY o XXX-YYYY, donde X es una letra mayúscula e Y es un dígito')
+    return placa
+
+
+def _dia_de_fecha(fecha):
+    """
+    Convierte una fecha AAAA-MM-DD en días desde 1970-01-01
+
+    aumenta
+    ------
+    ValorError
+        Si la fecha no tiene el formato AAAA-MM-DD o no existe
+    """
+    partes = _PATRON_FECHA.fullmatch(fecha)
+    try:
+        if partes is None:
+            raise ValueError
+        return datetime.date(int(partes[1]), int(partes[2]), int(partes[3])).toordinal() - _EPOCA
+    except ValueError:
+        raise ValueError('La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)') from None
+
+
+def _minuto_del_dia(tiempo):
+    """
+    Convierte una hora HH:MM (00:00 - 23:59) en minuto del día
+
+    aumenta
+    ------
+    ValorError
+        Si la hora no tiene el formato HH:MM
+    """
+    partes = _PATRON_TIEMPO.fullmatch(tiempo)
+    if partes is None:
+        raise ValueError('La hora debe tener el siguiente formato: HH:MM (por ejemplo, 08:31, 14:22, 00:01)')
+    return int(partes[1]) * 60 + int(partes[2])
+
+
+def _codificar_placa(placa):
+    """
+    Codifica una placa ya validada como entero: ((tres * 26 + X1) * 26 + X2) * 26 + X3) * 10000 + YYYY,
+    donde tres indica si la placa tiene tres letras, las letras son índices (0 = 'A') y X3 = 0 en placas de dos letras.
+    El resultado cabe en 32 bits sin signo.
+    """
+    letras, numero = placa.split('-')
+    codigo = len(letras) - 2
+    for letra in letras:
+        codigo = codigo * 26 + ord(letra) - _A
+    if len(letras) == 2:
+        codigo *= 26
+    return codigo * 10000 + int(numero)
+
+
+def _decodificar_placa(codigo):
+    """Devuelve la placa como cadena XX-YYYY o XXX-YYYY a partir de su código entero"""
+    resto, numero = divmod(int(codigo), 10000)
+    resto, x3 = divmod(resto, 26)
+    resto, x2 = divmod(resto, 26)
+    tres, x1 = divmod(resto, 26)
+    letras = chr(_A + x1) + chr(_A + x2) + (chr(_A + x3) if tres else '')
+    return '{}-{:04d}'.format(letras, numero)
+
+
+def _campos_placa(codigo):
+    """
+    Extrae de una placa codificada (entero o arreglo) los campos usados por las ordenanzas
+
+    Devoluciones
+    -------
+    Devuelve una tupla (digito, clase): último dígito y clase de exención, donde clase es la
+    segunda letra como índice (0 = 'A') más 26 si la placa tiene solo dos letras
+    """
+    letra = codigo // 260000 % 26
+    dos_letras = codigo < 26 ** 3 * 10000
+    return codigo % 10, letra + 26 * dos_letras
+
+
+def _codigos(valores, ancho):
+    """
+    Convierte una columna de cadenas en una matriz de puntos de código
+
+    Parámetros
+    ----------
+    valores : array_like de str
+        Columna de cadenas
+    ancho : int
+        Número de caracteres que se conservan por cadena
+    Devoluciones
+    -------
+    Devuelve una tupla (codigos, longitudes) donde codigos es una matriz (n, ancho) de int32
+    y longitudes es la longitud original de cada cadena
+    """
+    if hasattr(valores, 'buffers'):
+        return _codigos_arrow(valores, ancho)
+    arr = np.asarray(valores, dtype=np.str_).ravel()
+    longitudes = np.char.str_len(arr)
+    codigos = arr.astype('U%d' % ancho).view(np.uint32).reshape(-1, ancho).astype(np.int32)
+    return codigos, longitudes
+
+
+def _pyarrow():
+    """
+    Importa pyarrow, dependencia opcional de los formatos parquet y arrow
+
+    aumenta
+    ------
+    ImportError
+        Si pyarrow no está instalado
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Los formatos parquet y arrow requieren pyarrow: pip install pyarrow') from None
+    return pyarrow
+
+
+def _validos_arrow(arreglo):
+    """Devuelve la máscara de valores no nulos de un arreglo de Arrow"""
+    if not arreglo.null_count:
+        return np.ones(len(arreglo), dtype=bool)
+    return arreglo.is_valid().to_numpy(zero_copy_only=False)
+
+
+def _enteros_arrow(arreglo, tipo):
+    """Devuelve los valores de un arreglo de Arrow de ancho fijo como vista numpy de su búfer, sin copiarlo"""
+    tipo = np.dtype(tipo)
+    return np.frombuffer(arreglo.buffers()[1], dtype=tipo, count=len(arreglo), offset=arreglo.offset * tipo.itemsize)
+
+
+def _codigos_arrow(arreglo, ancho):
+    """
+    Versión de _codigos para una columna de texto de Arrow (string o large_string): los bytes UTF-8
+    se leen directamente de sus búferes, sin crear objetos str. Los valores nulos tienen longitud -1.
+    Los caracteres que no son ASCII ocupan varios bytes, pero nunca forman un valor válido.
+    """
+    pa = _pyarrow()
+    if pa.types.is_dictionary(arreglo.type):
+        arreglo = arreglo.dictionary_decode()
+    _, desplazamientos, datos = arreglo.buffers()
+    tipo = np.dtype('<i8' if pa.types.is_large_string(arreglo.type) else '<i4')
+    desplazamientos = np.frombuffer(desplazamientos, dtype=tipo, count=len(arreglo) + 1,
+                                    offset=arreglo.offset * tipo.itemsize).astype(np.int64)
+    datos = np.frombuffer(datos, dtype=np.uint8) if datos is not None else np.zeros(0, dtype=np.uint8)
+    longitudes = np.diff(desplazamientos)
+    dentro = np.arange(ancho) < longitudes[:, None]
+    codigos = np.zeros((len(arreglo), ancho), dtype=np.int32)
+    codigos[dentro] = datos[(desplazamientos[:-1, None] + np.arange(ancho))[dentro]]
+    return codigos, np.where(_validos_arrow(arreglo), longitudes, -1)
+
+
+# Días desde 1970-01-01 de 0001-01-01 y 9999-12-31, el rango de datetime.date
+_DIA_MINIMO = datetime.date.min.toordinal() - _EPOCA
+_DIA_MAXIMO = datetime.date.max.toordinal() - _EPOCA
+# Unidades por minuto de los tipos time32 y time64 de Arrow
+_UNIDADES_MINUTO = {'s': 60, 'ms': 60 * 10 ** 3, 'us': 60 * 10 ** 6, 'ns': 60 * 10 ** 9}
+
+
+def _analizar_fechas_arrow(arreglo):
+    """
+    Analiza una columna de fechas de Arrow: date32 y date64 se leen como enteros y las cadenas
+    se analizan como en _analizar_fechas
+
+    Devoluciones
+    -------
+    Devuelve una tupla (validas, dias) como _analizar_fechas
+    """
+    pa = _pyarrow()
+    if pa.types.is_date32(arreglo.type):
+        dias = _enteros_arrow(arreglo, '<i4').astype(np.int64)
+    elif pa.types.is_date64(arreglo.type):
+        dias = _enteros_arrow(arreglo, '<i8') // 86400000
+    else:
+        return _analizar_fechas(arreglo)
+    return _validos_arrow(arreglo) & (dias >= _DIA_MINIMO) & (dias <= _DIA_MAXIMO), dias
+
+
+def _analizar_tiempos_arrow(arreglo):
+    """
+    Analiza una columna de horas de Arrow: time32 y time64 se leen como enteros (los segundos se descartan)
+    y las cadenas se analizan como en _analizar_tiempos
+
+    Devoluciones
+    -------
+    Devuelve una tupla (validos, minutos) como _analizar_tiempos
+    """
+    pa = _pyarrow()
+    if pa.types.is_time32(arreglo.type):
+        valores = _enteros_arrow(arreglo, '<i4').astype(np.int64)
+    elif pa.types.is_time64(arreglo.type):
+        valores = _enteros_arrow(arreglo, '<i8')
+    else:
+        return _analizar_tiempos(arreglo)
+    minutos = valores // _UNIDADES_MINUTO[arreglo.type.unit]
+    return _validos_arrow(arreglo) & (valores >= 0) & (minutos < 1440), minutos
+
+
+def _columna_texto(valores):
+    """
+    Convierte una columna en un arreglo plano de str para la validación por lotes.
+    Si la columna contiene valores anidados (listas, dicts), estos quedan vacíos en lugar de lanzar una excepción.
+    """
+    try:
+        return np.asarray(valores, dtype=np.str_).ravel()
+    except (ValueError, TypeError):
+        return np.array([v if isinstance(v, (str, int, float)) else '' for v in valores], dtype=np.str_)
+
+
+def _es_letra(c):
+    """Devuelve una máscara de los códigos que son letras mayúsculas A-Z"""
+    return (c >= 65) & (c <= 90)
+
+
+def _es_digito(c):
+    """Devuelve una máscara de los códigos que son dígitos 0-9"""
+    return (c >= 48) & (c <= 57)
+
+
+def _analizar_placas(placas):
+    """
+    Analiza una columna de placas con el formato XX-YYYY o XXX-YYYY
+
+    Parámetros
+    ----------
+    placas : array_like de str
+    Devoluciones
+    -------
+    Devuelve una tupla (validas, codigo) de arreglos: máscara de placas válidas y
+    placa codificada como entero (ver _codificar_placa)
+    """
+    c, n = _codigos(placas, 8)
+    tres = ((n == 8) & _es_letra(c[:, 0]) & _es_letra(c[:, 1]) & _es_letra(c[:, 2]) & (c[:, 3] == _GUION)
+            & _es_digito(c[:, 4:8]).all(axis=1))
+    dos = ((n == 7) & _es_letra(c[:, 0]) & _es_letra(c[:, 1]) & (c[:, 2] == _GUION)
+           & _es_digito(c[:, 3:7]).all(axis=1))
+    validas = tres | dos
+    letras = np.where(validas[:, None], c[:, :3] - _A, 0)
+    letras[:, 2] *= tres
+    numero = np.where(tres[:, None], c[:, 4:8], c[:, 3:7]) - _CERO
+    codigo = (((tres * 26 + letras[:, 0]) * 26 + letras[:, 1]) * 26 + letras[:, 2]) * 10000
+    codigo += ((numero[:, 0] * 10 + numero[:, 1]) * 10 + numero[:, 2]) * 10 + numero[:, 3]
+    return validas, np.where(validas, codigo, 0).astype(np.uint32)
+
+
+def _analizar_fechas(fechas):
+    """
+    Analiza una columna de fechas con el formato ISO 8601 AAAA-MM-DD
+
+    Parámetros
+    ----------
+    fechas : array_like de str
+    Devoluciones
+    -------
+    Devuelve una tupla (validas, dias) de arreglos: máscara de fechas válidas y
+    número de días desde 1970-01-01 (compatible con datetime64[D])
+    """
+    c, n = _codigos(fechas, 10)
+    d = c - _CERO
+    formato = ((n == 10) & _es_digito(c[:, [0, 1, 2, 3, 5, 6, 8, 9]]).all(axis=1)
+               & (c[:, 4] == _GUION) & (c[:, 7] == _GUION))
+    anio = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+    mes = d[:, 5] * 10 + d[:, 6]
+    dia = d[:, 8] * 10 + d[:, 9]
+    bisiesto = (anio % 4 == 0) & ((anio % 100 != 0) | (anio % 400 == 0))
+    mes_ok = formato & (mes >= 1) & (mes <= 12)
+    dias_mes = _DIAS_MES[np.where(mes_ok, mes, 0)] + ((mes == 2) & bisiesto)
+    validas = mes_ok & (anio >= 1) & (dia >= 1) & (dia <= dias_mes)
+    # Algoritmo days_from_civil: días desde la época Unix en el calendario gregoriano proléptico
+    a = anio.astype(np.int64) - (mes <= 2)
+    era = a // 400
+    yoe = a - era * 400
+    doy = (153 * np.where(mes > 2, mes - 3, mes + 9) + 2) // 5 + dia - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return validas, era * 146097 + doe - 719468
+
+
+def _analizar_tiempos(tiempos):
+    """
+    Analiza una columna de horas con el formato HH:MM
+
+    Parámetros
+    ----------
+    tiempos : array_like de str
+    Devoluciones
+    -------
+    Devuelve una tupla (validos, minutos) de arreglos: máscara de horas válidas y minuto del día
+    """
+    c, n = _codigos(tiempos, 5)
+    d = c - _CERO
+    hh = d[:, 0] * 10 + d[:, 1]
+    mm = d[:, 3] * 10 + d[:, 4]
+    validos = ((n == 5) & _es_digito(c[:, [0, 1, 3, 4]]).all(axis=1) & (c[:, 2] == _DOS_PUNTOS)
+               & (hh <= 23) & (mm <= 59))
+    return validos, hh * 60 + mm
+
+
+class ReglaCompilada:
+    """
+    Una versión de la ordenanza de Pico y Placa compilada en tablas de consulta directa.
+    ...
+    Atributos
+    ----------
+    id : str
+        identificador de la ordenanza (por ejemplo, ORDM-305)
+    desde : int
+        día (desde 1970-01-01) a partir del cual la ordenanza está vigente
+    mapa : numpy.ndarray
+        arreglo uint16 de 7 * 1440 elementos indexado por minuto de la semana (0 = lunes 00:00);
+        el bit d indica que las placas terminadas en d están restringidas en ese minuto
+    exentas : numpy.ndarray
+        arreglo booleano de 52 elementos indexado por la clase de exención de la placa
+        (segunda letra como índice, 0 = 'A', más 26 si la placa tiene solo dos letras)
+    pico : numpy.ndarray
+        arreglo booleano de 1440 elementos indexado por minuto del día, True en horas pico
+    """
+    # Días de la semana en el orden de datetime.weekday()
+    DIAS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+    # Motivos de una decisión sin considerar feriados, en el orden en que se evalúan
+    MOTIVOS = ('placa_exenta', 'fuera_hora_pico', 'digito_permitido', 'restringido')
+
+    def __init__(self, config):
+        """
+        Compila una ordenanza a partir de su configuración
+
+        Parámetros
+        ----------
+        config : dict
+            con las claves id, vigente_desde, horas_pico, letras_exentas, exentas_dos_letras y restricciones
+
+        aumenta
+        ------
+        ValorError
+            Si la configuración no tiene el formato esperado
+        """
+        try:
+            self.id = config['id']
+            self.desde = datetime.date.fromisoformat(config['vigente_desde']).toordinal() - _EPOCA
+            ventanas = [(_minuto_del_dia(inicio), _minuto_del_dia(fin)) for inicio, fin in config['horas_pico']]
+            self.pico = np.zeros(1440, dtype=bool)
+            for inicio, fin in ventanas:
+                if inicio > fin:
+                    raise ValueError('ventana de hora pico invertida {:02d}:{:02d} - {:02d}:{:02d}'.format(
+                        *divmod(inicio, 60), *divmod(fin, 60)))
+                self.pico[inicio:fin + 1] = True
+            self.mapa = np.zeros(7 * 1440, dtype=np.uint16)
+            for dia, digitos in config['restricciones'].items():
+                base = self.DIAS.index(dia) * 1440
+                bits = 0
+                for d in digitos:
+                    if not 0 <= d <= 9:
+                        raise ValueError(d)
+                    bits |= 1 << d
+                for inicio, fin in ventanas:
+                    # Las ventanas de hora pico incluyen ambos extremos
+                    self.mapa[base + inicio:base + fin + 1] |= bits
+            self.exentas = np.zeros(52, dtype=bool)
+            for letra in config.get('letras_exentas', ''):
+                if not 'A' <= letra <= 'Z':
+                    raise ValueError('letra exenta inválida {!r}'.format(letra))
+                self.exentas[ord(letra) - _A] = True
+                self.exentas[ord(letra) - _A + 26] = True
+            if config.get('exentas_dos_letras', False):
+                self.exentas[26:] = True
+        except (KeyError, TypeError, ValueError, IndexError) as error:
+            raise ValueError('Ordenanza mal configurada {!r}: {}'.format(config.get('id'), error)) from None
+
+    def restringido(self, dia, minuto, digito, clase):
+        """
+        Comprueba si un vehículo está restringido, sin considerar feriados
+
+        Parámetros
+        ----------
+        dia : int
+            días desde 1970-01-01
+        minuto : int
+            minuto del día (0 - 1439)
+        digito : int
+            último dígito de la placa
+        clase : int
+            clase de exención de la placa (ver _campos_placa)
+        Devoluciones
+        -------
+        Devuelve True si el vehículo no puede circular, de lo contrario False
+        """
+        if self.exentas[clase]:
+            return False
+        return bool(self.mapa[(dia + 3) % 7 * 1440 + minuto] >> digito & 1)
+
+    def restringidos_lote(self, dias, minutos, digitos, clases):
+        """Versión vectorizada de restringido(): todos los argumentos son arreglos de la misma longitud"""
+        # 1970-01-01 fue jueves (weekday() == 3)
+        bits = self.mapa[(dias + 3) % 7 * 1440 + minutos] >> digitos & 1
+        return (bits != 0) & ~self.exentas[clases]
+
+    def motivo(self, dia, minuto, digito, clase):
+        """Devuelve el motivo de la decisión (uno de MOTIVOS) con los mismos argumentos que restringido()"""
+        if self.exentas[clase]:
+            return 'placa_exenta'
+        if not self.pico[minuto]:
+            return 'fuera_hora_pico'
+        if not self.mapa[(dia + 3) % 7 * 1440 + minuto] >> digito & 1:
+            return 'digito_permitido'
+        return 'restringido'
+
+    def motivos_lote(self, dias, minutos, digitos, clases):
+        """Versión vectorizada de motivo(): devuelve índices en MOTIVOS"""
+        motivos = np.full(np.shape(dias), 3, dtype=np.int8)
+        bits = self.mapa[(dias + 3) % 7 * 1440 + minutos] >> digitos & 1
+        motivos[bits == 0] = 2
+        motivos[~self.pico[minutos]] = 1
+        motivos[self.exentas[clases]] = 0
+        return motivos
+
+    def intervalos(self, dia_semana, digito):
+        """
+        Devuelve los intervalos de restricción de un día de la semana para un último dígito
+
+        Parámetros
+        ----------
+        dia_semana : int
+            0 = lunes, como datetime.weekday()
+        digito : int
+        Devoluciones
+        -------
+        Devuelve una lista de tuplas (inicio, fin) en minutos del día, con fin excluido:
+        el vehículo está restringido desde el minuto inicio hasta el minuto fin - 1 inclusive
+        """
+        bits = (self.mapa[dia_semana * 1440:(dia_semana + 1) * 1440] >> digito & 1).astype(np.int8)
+        bordes = np.diff(np.concatenate(([0], bits, [0])))
+        return list(zip(np.flatnonzero(bordes == 1).tolist(), np.flatnonzero(bordes == -1).tolist()))
+
+
+class MotorRestricciones:
+    """
+    Conjunto de versiones de la ordenanza de Pico y Placa cargadas a la vez, de modo que cada
+    fecha se evalúa con la ordenanza vigente ese día. Las fechas anteriores a la primera versión
+    se evalúan con la primera versión.
+    ...
+    Atributos
+    ----------
+    reglas : list de ReglaCompilada
+        versiones ordenadas por fecha de entrada en vigencia
+    Métodos
+    -------
+    cargar(cls, ruta=None):
+        Construye el motor a partir de un archivo JSON de ordenanzas
+    regla(self, dia):
+        Devuelve la versión vigente en el día dado
+    versiones_lote(self, dias):
+        Devuelve el índice en reglas de la versión vigente en cada día
+    restringido(self, dia, minuto, digito, clase):
+        Devuelve True si el vehículo no puede circular, sin considerar feriados
+    restringidos_lote(self, dias, minutos, digitos, clases):
+        Versión vectorizada de restringido()
+    motivo(self, dia, minuto, digito, clase):
+        Devuelve el motivo de la decisión según la ordenanza vigente (ver ReglaCompilada.MOTIVOS)
+    motivos_lote(self, dias, minutos, digitos, clases):
+        Versión vectorizada de motivo()
+    """
+    # Archivo de ordenanzas distribuido junto a este módulo
+    RUTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ordenanzas_pico_placa.json')
+
+    def __init__(self, ordenanzas):
+        """
+        Compila todas las versiones de la ordenanza.
+
+        Parámetros
+        ----------
+        ordenanzas : list de dict
+            configuración de cada versión (ver ReglaCompilada)
+        """
+        if not ordenanzas:
+            raise ValueError('Se requiere al menos una ordenanza')
+        self.reglas = sorted((ReglaCompilada(o) for o in ordenanzas), key=lambda r: r.desde)
+        self._desde = np.array([r.desde for r in self.reglas], dtype=np.int64)
+
+    @classmethod
+    def cargar(cls, ruta=None):
+        """
+        Construye el motor a partir de un archivo JSON de ordenanzas
+
+        Parámetros
+        ----------
+        ruta : str, opcional
+            archivo de ordenanzas; por defecto $PICO_PLACA_ORDENANZAS o el archivo distribuido con el módulo
+        """
+        ruta = ruta or os.environ.get('PICO_PLACA_ORDENANZAS') or cls.RUTA
+        with open(ruta, encoding='utf-8') as archivo:
+            config = json.load(archivo)
+        if config.get('formato') != 1:
+            raise ValueError('Formato de archivo de ordenanzas no soportado: {!r}'.format(config.get('formato')))
+        return cls(config['ordenanzas'])
+
+    def regla(self, dia):
+        """Devuelve la versión de la ordenanza vigente en el día dado (días desde 1970-01-01)"""
+        return self.reglas[max(bisect.bisect_right(self._desde, dia) - 1, 0)]
+
+    def versiones_lote(self, dias):
+        """Versión vectorizada de regla(): devuelve el índice en reglas de la versión vigente en cada día"""
+        return np.maximum(np.searchsorted(self._desde, dias, side='right') - 1, 0)
+
+    def restringido(self, dia, minuto, digito, clase):
+        """Devuelve True si el vehículo no puede circular según la ordenanza vigente, sin considerar feriados"""
+        return self.regla(dia).restringido(dia, minuto, digito, clase)
+
+    def restringidos_lote(self, dias, minutos, digitos, clases):
+        """Versión vectorizada de restringido(): todos los argumentos son arreglos de la misma longitud"""
+        if len(self.reglas) == 1:
+            return self.reglas[0].restringidos_lote(dias, minutos, digitos, clases)
+        versiones = self.versiones_lote(dias)
+        resultado = np.zeros(np.shape(dias), dtype=bool)
+        for v in np.unique(versiones):
+            sel = versiones == v
+            resultado[sel] = self.reglas[v].restringidos_lote(
+                dias[sel], minutos[sel], digitos[sel], clases[sel])
+        return resultado
+
+    def motivo(self, dia, minuto, digito, clase):
+        """Devuelve el motivo de la decisión según la ordenanza vigente (ver ReglaCompilada.MOTIVOS)"""
+        return self.regla(dia).motivo(dia, minuto, digito, clase)
+
+    def motivos_lote(self, dias, minutos, digitos, clases):
+        """Versión vectorizada de motivo(): devuelve índices en ReglaCompilada.MOTIVOS"""
+        versiones = self.versiones_lote(dias)
+        resultado = np.zeros(np.shape(dias), dtype=np.int8)
+        for v in np.unique(versiones):
+            sel = versiones == v
+            resultado[sel] = self.reglas[v].motivos_lote(dias[sel], minutos[sel], digitos[sel], clases[sel])
+        return resultado
+
+
+# Registro compacto (10 bytes) de una consulta ya analizada: placa codificada, días desde 1970-01-01 y minuto del día
+REGISTRO_PICO_PLACA = np.dtype([('placa', '<u4'), ('dia', '<i4'), ('minuto', '<u2')])
+
+# Ordenanzas de Pico y Placa compartidas por todas las instancias de PicoPlaca del proceso
+MOTOR_RESTRICCIONES = MotorRestricciones.cargar()
+
+
+class PicoPlaca:
+    """
+    Una clase para representar un vehículo.
+    medida de restricción (Pico y Placa) 
+    - ORDENANZA METROPOLITANA No. 0305
+    http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+    ...
+    Los valores se analizan una sola vez al asignarlos y se guardan como enteros en __slots__
+    (placa codificada, días desde 1970-01-01 y minuto del día); las cadenas se reconstruyen al leerlas.
+    ...
+    Atributos
+    ----------
+    placa : str 
+        El registro o patente de un vehículo es una combinación de caracteres alfabéticos o numéricos
+        caracteres que identifican e individualizan el vehículo respecto de los demás;
+        
+        El formato utilizado es
+        XX-YYYY o XXX-YYYY,
+        donde X es una letra mayúscula e Y es un dígito.
+    fecha : str
+        Fecha en la que el vehículo pretende transitar
+        esta siguiendo el
+        Formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
+    hora : str
+        tiempo en que el vehículo pretende transitar
+        esta siguiendo el formato
+        HH:MM: por ejemplo, 08:35, 19:30
+    online: boolean, opcional
+        if online == Cierto, se utilizará la API abstracta de días festivos
+    dia : int
+        días desde 1970-01-01 (solo lectura)
+    minuto : int
+        minuto del día (solo lectura)
+    digito : int
+        último dígito de la placa (solo lectura)
+    clase : int
+        clase de exención de la placa: segunda letra como índice más 26 si la placa tiene dos letras (solo lectura)
+    Metodos
+    -------
+    __init__(self, placa, fecha, hora, online=False):
+        Construye todos los atributos necesarios.
+        para el objeto PicoPlaca.
+    from_parsed(cls, placa, dia, minuto, online=False):
+        Construye el objeto a partir de valores ya analizados, sin validarlos
+    placa(self):
+        Obtiene el valor del atributo de placa
+    placa(self, value):
+        Establece el valor del atributo de la placa
+    fecha(self):
+        Obtiene el valor del atributo de fecha
+    fecha(self, value):
+        Establece el valor del atributo de fecha
+    hora(self):
+        Obtiene el valor del atributo de tiempo
+    hora(self, value):
+        Establece el valor del atributo de tiempo
+    __circula_sin_feriado(self):
+        Devuelve True si el vehículo puede circular según la ordenanza vigente (MOTOR_RESTRICCIONES), sin considerar feriados
+    __feriado:
+        Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, Falso
+    predecir(self):
+        Devuelve True si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora especificadas, de lo contrario, Falso
+    predecir_con_fuente(self):
+        Igual que predecir(), devolviendo también la fuente que decidió (ordenanza, local, cache, api o respaldo)
+    predecir_lote(cls, placas, fechas, tiempos, online=False):
+        Devuelve un arreglo booleano con el resultado de predecir() para cada registro de las columnas dadas
+    analizar_lote(cls, placas, fechas, tiempos):
+        Valida columnas de cadenas y devuelve un arreglo de REGISTRO_PICO_PLACA
+    validar_lote(cls, placas, fechas, tiempos, errores=None, primera_fila=0):
+        Igual que analizar_lote() sin lanzar excepciones: devuelve la máscara de registros válidos
+        y envía la fila y el motivo de cada registro inválido a errores
+    predecir_registros(cls, registros, online=False):
+        Igual que predecir_lote() para un arreglo de REGISTRO_PICO_PLACA
+    predecir_async(self):
+        Versión asyncio de predecir() para el modo online
+    predecir_lote_async(cls, placas, fechas, tiempos, online=True):
+        Versión asyncio de predecir_lote() con consultas de feriados concurrentes
+    analizar_arrow(cls, lote):
+        Igual que analizar_lote() para una tabla o un lote de registros de Arrow
+    validar_arrow(cls, lote, errores=None, primera_fila=0):
+        Igual que validar_lote() para una tabla o un lote de registros de Arrow
+    predecir_arrow(cls, lote, online=False, columna='allowed', errores=None, primera_fila=0):
+        Añade la columna de decisiones a una tabla o un lote de registros de Arrow
+    ventanas_restriccion(cls, placa, desde, hasta, online=False):
+        Devuelve los intervalos en los que el vehículo no puede circular entre dos fechas
+    ventanas_restriccion_flota(cls, placas, desde, hasta, online=False):
+        ventanas_restriccion() para varias placas
+    """ 
+    __slots__ = ('_placa', '_dia', '_minuto', 'online')
+    # Motivos por los que validar_lote() rechaza un registro, en el orden en que se comprueban
+    MOTIVOS_INVALIDOS = ('registro_ilegible', 'placa_invalida', 'fecha_invalida', 'tiempo_invalido')
+
+    def __init__(self, placa, fecha, tiempo, online=False):
+        """
+        Construye todos los atributos necesarios para el objeto PicoPlaca.
+        
+        Parámetros
+        ----------
+            placa : calle
+                El registro o patente de un vehículo es una combinación de caracteres alfabéticos o numéricos
+                caracteres que identifican e individualizan el vehículo respecto de los demás;
+                El formato utilizado es AA-YYYY o XXX-YYYY, donde X es una letra mayúscula e Y es un dígito.
+            fecha: calle
+                Fecha en la que el vehículo pretende transitar
+                Sigue el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
+            tiempo: calle
+                tiempo en que el vehículo pretende transitar
+                Sigue el formato HH:MM: por ejemplo, 08:35, 19:30
+            en línea: booleano, opcional
+                si en línea == Verdadero, se usará la API de días festivos abstractos (el valor predeterminado es Falso)               
+        """                
+        inicio = time.perf_counter() if METRICAS.activo else None
+        self.placa = placa
+        self.fecha = fecha
+        self.tiempo = tiempo
+        self.online = online
+        if inicio is not None:
+            METRICAS.tiempo('validacion', time.perf_counter() - inicio)
+
+
+    @classmethod
+    def from_parsed(cls, placa, dia, minuto, online=False):
+        """
+        Construye el objeto a partir de valores ya analizados y validados, sin volver a validarlos.
+
+        Parámetros
+        ----------
+            placa : int o str
+                placa codificada (como en REGISTRO_PICO_PLACA) o cadena XX-YYYY / XXX-YYYY válida
+            dia : int o datetime.date
+                días desde 1970-01-01, o la fecha
+            minuto : int
+                minuto del día (0 - 1439)
+            en línea: booleano, opcional
+                si en línea == Verdadero, se usará la API de días festivos abstractos (el valor predeterminado es Falso)
+        """
+        pyp = cls.__new__(cls)
+        pyp._placa = _codificar_placa(placa) if isinstance(placa, str) else int(placa)
+        pyp._dia = dia.toordinal() - _EPOCA if isinstance(dia, datetime.date) else int(dia)
+        pyp._minuto = int(minuto)
+        pyp.online = online
+        return pyp
+
+
+    @property
+    def placa(self):
+        """Tiene el atributo de la placa un valor"""
+        return _decodificar_placa(self._placa)
+
+
+    @placa.setter
+    def placa(self, valor):
+        """
+        Establece el valor del atributo de la placa
+        Parámetros
+        ----------
+        valor: str
+        
+        aumenta
+        ------
+        ValorError
+            Si la cadena de valor no tiene el formato
+            XX-YYYY o XXX-YYYY,
+            donde X es una letra mayúscula e Y es un dígito
+        """
+        self._placa = _codificar_placa(_validar_placa(valor))
+
+
+    @property
+    def fecha(self):
+        """Tiene valor el atrivuto fecha"""
+        return datetime.date.fromordinal(self._dia + _EPOCA).isoformat()
+
+
+    @fecha.setter
+    def fecha(self, valor):
+        """
+        Establece el valor del atributo de fecha
+        Parámetros
+        ----------
+        valor : str
+        
+        aumenta
+        ------
+        ValorError
+            Si la cadena de valor no tiene el formato AAAA-MM-DD (por ejemplo, 2021-04-02)
+        """
+        self._dia = _dia_de_fecha(valor)
+        
+
+    @property
+    def tiempo(self):
+        """Tiene valor el atrivuto tiempo"""
+        return '{:02d}:{:02d}'.format(*divmod(self._minuto, 60))
+
+
+    @tiempo.setter
+    def tiempo(self, valor):
+        """
+        Establece el valor del atributo de tiempo
+        Parámetros
+        ----------
+        valor: str
+        
+        aumenta
+        ------
+        ValorError
+            Si la cadena de valor no tiene el formato HH:MM (por ejemplo, 08:31, 14:22, 00:01)
+        """
+        self._minuto = _minuto_del_dia(valor)
+
+
+    @property
+    def dia(self):
+        """Días desde 1970-01-01 de la fecha"""
+        return self._dia
+
+
+    @property
+    def minuto(self):
+        """Minuto del día del tiempo"""
+        return self._minuto
+
+
+    @property
+    def digito(self):
+        """Último dígito de la placa"""
+        return self._placa % 10
+
+
+    @property
+    def clase(self):
+        """Clase de exención de la placa (ver _campos_placa)"""
+        return _campos_placa(self._placa)[1]
+
+
+    @staticmethod
+    def __is_holiday(dia, online):
+        """
+        Comprueba si la fecha es un día festivo en Ecuador
+        si en línea == Verdadero, utilizará una API REST, de lo contrario, generará los días festivos del año examinado
+        
+        Parámetros
+        ----------
+        dia: int
+            días desde 1970-01-01
+        en línea: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos
+        Devoluciones
+        -------
+        Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, False
+        """            
+        fecha = datetime.date.fromordinal(dia + _EPOCA)
+
+        if online:
+            # La clave API se recupera de la variable de entorno HOLIDAYS_API_KEY
+            return CLIENTE_FERIADOS.es_feriado(fecha)
+        else:
+            return CACHE_FERIADOS.es_feriado(fecha)
+
+
+    def predecir(self):
+        """
+        Comprueba si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora proporcionada según las reglas de Pico y Placa:
+        http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+        Devoluciones
+        -------
+        Devoluciones
+        Verdadero si el vehículo con
+        la placa especificada puede estar en el camino
+        en la fecha y hora especificadas, de lo contrario Falso
+        """
+        if METRICAS.activo:
+            return self.__predecir_medido()
+        # Las reglas de la ordenanza se comprueban primero; si el vehículo estaría restringido,
+        # puede circular solo si la fecha es un día festivo
+        if self.__circula_sin_feriado():
+            return True
+        return self.__is_holiday(self._dia, self.online)
+
+
+    def predecir_con_fuente(self):
+        """
+        Igual que predecir(), indicando además qué fuente decidió
+
+        Devoluciones
+        -------
+        Devuelve una tupla (puede_circular, fuente), donde fuente es 'ordenanza' si no hizo falta consultar
+        feriados, 'local' si se usó el calendario local en modo sin conexión, o la fuente informada por
+        ClienteFeriados.consultar() en modo online ('cache', 'api' o 'respaldo')
+        """
+        if self.__circula_sin_feriado():
+            return True, 'ordenanza'
+        if self.online:
+            return CLIENTE_FERIADOS.consultar(datetime.date.fromordinal(self._dia + _EPOCA))
+        return self.__is_holiday(self._dia, False), 'local'
+
+
+    def __predecir_medido(self):
+        """
+        predecir() con métricas: tiempo de las etapas reglas y feriado y conteo de decisiones por motivo
+        (placa_exenta, fuera_hora_pico, digito_permitido, feriado o restringido)
+        """
+        inicio = time.perf_counter()
+        motivo = MOTOR_RESTRICCIONES.motivo(self._dia, self._minuto, *_campos_placa(self._placa))
+        medio = time.perf_counter()
+        METRICAS.tiempo('reglas', medio - inicio)
+        if motivo == 'restringido':
+            if self.__is_holiday(self._dia, self.online):
+                motivo = 'feriado'
+            METRICAS.tiempo('feriado_online' if self.online else 'feriado', time.perf_counter() - medio)
+        METRICAS.contar('decisiones', motivo)
+        return motivo != 'restringido'
+
+
+    async def predecir_async(self):
+        """
+        Versión asyncio de predecir(): en modo online la consulta de feriados no bloquea el bucle de eventos
+        y se agrupa con otras consultas simultáneas de la misma fecha.
+        Devoluciones
+        -------
+        Verdadero si el vehículo con la placa especificada puede estar en el camino
+        en la fecha y hora especificadas, de lo contrario Falso
+        """
+        if self.__circula_sin_feriado():
+            return True
+        if self.online:
+            return await CLIENTE_FERIADOS.es_feriado_async(datetime.date.fromordinal(self._dia + _EPOCA))
+        return self.__is_holiday(self._dia, False)
+
+
+    def __circula_sin_feriado(self):
+        """
+        Aplica las reglas de Pico y Placa sin considerar feriados
+        Devoluciones
+        -------
+        Verdadero si el vehículo está exento, fuera de horas pico o con un dígito no restringido ese día
+        """
+        # Las letras exentas, las horas pico y los dígitos restringidos por día provienen de la ordenanza vigente
+        # https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
+        digito, clase = _campos_placa(self._placa)
+        return not MOTOR_RESTRICCIONES.restringido(self._dia, self._minuto, digito, clase)
+
+
+    @staticmethod
+    def __feriados_lote(dias, online):
+        """
+        Comprueba qué días de una columna son feriados en Ecuador, consultando cada fecha distinta una sola vez
+
+        Parámetros
+        ----------
+        dias : numpy.ndarray
+            Días desde 1970-01-01 (compatible con datetime64[D])
+        online: booleano
+            si online == Verdadero, se utilizará la API de días festivos abstractos
+        Devoluciones
+        -------
+        Devuelve una máscara booleana con True para los días festivos
+        """
+        unicos, inversa = np.unique(dias, return_inverse=True)
+        if unicos.size == 0:
+            return np.zeros(dias.shape, dtype=bool)
+        fechas = unicos.astype('datetime64[D]')
+        if online:
+            marcas = np.array([PicoPlaca.__is_holiday(int(d), True) for d in unicos], dtype=bool)
+        else:
+            inicio_anio = fechas.astype('datetime64[Y]')
+            anios = inicio_anio.astype(np.int64) + 1970
+            dia_anio = (fechas - inicio_anio.astype('datetime64[D]')).astype(np.int64)
+            marcas = np.zeros(unicos.shape, dtype=bool)
+            for anio in np.unique(anios):
+                sel = anios == anio
+                marcas[sel] = CACHE_FERIADOS.feriados(int(anio))[dia_anio[sel]]
+        return marcas[inversa]
+
+
+    @classmethod
+    def analizar_lote(cls, placas, fechas, tiempos):
+        """
+        Valida y analiza columnas de cadenas en un arreglo compacto de registros
+
+        Parámetros
+        ----------
+        placas : array_like de str
+            Placas con el formato XX-YYYY o XXX-YYYY
+        fechas : array_like de str
+            Fechas con el formato ISO 8601 AAAA-MM-DD
+        tiempos : array_like de str
+            Horas con el formato HH:MM
+        Devoluciones
+        -------
+        Devuelve un arreglo de REGISTRO_PICO_PLACA
+
+        aumenta
+        ------
+        ValorError
+            Si las columnas no tienen la misma longitud o algún registro no tiene el formato esperado
+        """
+        validos, registros = cls.validar_lote(placas, fechas, tiempos)
+        if not validos.all():
+            # Los validadores de los setters dan el mismo mensaje que la construcción registro por registro
+            i = int(np.argmin(validos))
+            placa, fecha, tiempo = (str(np.ravel(columna)[i]) for columna in (placas, fechas, tiempos))
+            if not (placa or fecha or tiempo):
+                raise ValueError('Registro ilegible en la fila {}'.format(i))
+            _validar_placa(placa)
+            _dia_de_fecha(fecha)
+            _minuto_del_dia(tiempo)
+            raise ValueError('Registro inválido en la fila {}'.format(i))
+        return registros
+
+
+    @classmethod
+    def validar_lote(cls, placas, fechas, tiempos, errores=None, primera_fila=0):
+        """
+        Valida y analiza columnas de cadenas en una sola pasada vectorizada, sin lanzar excepciones
+        por los registros inválidos
+
+        Parámetros
+        ----------
+        placas, fechas, tiempos : array_like de str
+            como en analizar_lote(); un registro con los tres valores vacíos se considera ilegible
+        errores : list u objeto con extend(), opcional
+            recibe una tupla (fila, motivo) por cada registro inválido, con motivo en MOTIVOS_INVALIDOS
+            (el primero que aplica)
+        primera_fila : int, opcional
+            número de la primera fila, sumado a las filas informadas en errores (el valor predeterminado es 0)
+        Devoluciones
+        -------
+        Devuelve una tupla (validos, registros): máscara de registros válidos y arreglo de REGISTRO_PICO_PLACA
+        con todas las filas (las inválidas con valores sin sentido)
+
+        aumenta
+        ------
+        ValorError
+            Si las columnas no tienen la misma longitud
+        """
+        inicio = time.perf_counter() if METRICAS.activo else None
+        placas, fechas, tiempos = (_columna_texto(columna) for columna in (placas, fechas, tiempos))
+        if not placas.size == fechas.size == tiempos.size:
+            raise ValueError('Las columnas de placas, fechas y tiempos deben tener la misma longitud')
+        placa_ok, codigos = _analizar_placas(placas)
+        fecha_ok, dias = _analizar_fechas(fechas)
+        tiempo_ok, minutos = _analizar_tiempos(tiempos)
+        validos = placa_ok & fecha_ok & tiempo_ok
+        if errores is not None and not validos.all():
+            ilegibles = (placas == '') & (fechas == '') & (tiempos == '')
+            cls.__registrar_errores(validos, ilegibles, (placa_ok, fecha_ok, tiempo_ok), errores, primera_fila)
+        registros = np.empty(validos.size, dtype=REGISTRO_PICO_PLACA)
+        registros['placa'] = codigos
+        registros['dia'] = np.where(fecha_ok, dias, 0)
+        registros['minuto'] = np.where(tiempo_ok, minutos, 0)
+        if inicio is not None:
+            METRICAS.tiempo('validacion_lote', time.perf_counter() - inicio)
+        return validos, registros
+
+
+    @staticmethod
+    def __registrar_errores(validos, ilegibles, correctos, errores, primera_fila):
+        """
+        Envía a errores una tupla (fila, motivo) por cada registro inválido, con el primer motivo
+        de MOTIVOS_INVALIDOS que aplica según las máscaras de registros ilegibles y de placa, fecha y tiempo correctos
+        """
+        placa_ok, fecha_ok, tiempo_ok = correctos
+        filas = np.flatnonzero(~validos)
+        motivos = np.select([ilegibles[filas], ~placa_ok[filas], ~fecha_ok[filas], ~tiempo_ok[filas]], [0, 1, 2, 3])
+        errores.extend(zip((filas + primera_fila).tolist(),
+                           (PicoPlaca.MOTIVOS_INVALIDOS[m] for m in motivos.tolist())))
+        if METRICAS.activo:
+            for motivo, n in zip(PicoPlaca.MOTIVOS_INVALIDOS, np.bincount(motivos, minlength=4).tolist()):
+                METRICAS.contar('registros_invalidos', motivo, n)
+
+
+    @staticmethod
+    def __restringidos(registros):
+        """
+        Evalúa las reglas de Pico y Placa sin considerar feriados
+
+        Devoluciones
+        -------
+        Devuelve una tupla (dias, restringido): días desde 1970-01-01 de cada registro y
+        máscara de los registros que no pueden circular salvo que la fecha sea feriado
+        """
+        inicio = time.perf_counter() if METRICAS.activo else None
+        dias = registros['dia'].astype(np.int64)
+        minutos = registros['minuto'].astype(np.int64)
+        digitos, clases = _campos_placa(registros['placa'].astype(np.int64))
+        restringido = MOTOR_RESTRICCIONES.restringidos_lote(dias, minutos, digitos, clases)
+        if inicio is not None:
+            METRICAS.tiempo('reglas_lote', time.perf_counter() - inicio)
+            motivos = np.bincount(MOTOR_RESTRICCIONES.motivos_lote(dias, minutos, digitos, clases), minlength=4)
+            for motivo, n in zip(ReglaCompilada.MOTIVOS[:3], motivos.tolist()):
+                METRICAS.contar('decisiones', motivo, n)
+        return dias, restringido
+
+
+    @classmethod
+    def predecir_registros(cls, registros, online=False):
+        """
+        Aplica predecir() a un arreglo de REGISTRO_PICO_PLACA ya analizado, sin validarlo.
+        Los feriados se consultan una sola vez por fecha distinta y solo para los registros
+        que estarían restringidos en un día laborable.
+
+        Parámetros
+        ----------
+        registros : numpy.ndarray de REGISTRO_PICO_PLACA
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        Devoluciones
+        -------
+        Devuelve un arreglo booleano donde cada elemento es True si el vehículo del registro
+        puede estar en la carretera, de lo contrario False
+        """
+        dias, restringido = cls.__restringidos(registros)
+        inicio = time.perf_counter() if METRICAS.activo else None
+        marcas = cls.__feriados_lote(dias[restringido], online) if restringido.any() else None
+        return cls.__decidir(restringido, marcas, online, inicio)
+
+
+    @staticmethod
+    def __decidir(restringido, marcas, online, inicio):
+        """
+        Combina los registros restringidos con sus marcas de feriado y registra en METRICAS el tiempo
+        de la consulta de feriados y las decisiones por feriado y por restricción
+
+        Parámetros
+        ----------
+        restringido : numpy.ndarray
+            máscara de los registros que no pueden circular salvo que la fecha sea feriado
+        marcas : numpy.ndarray o None
+            máscara de feriados de los registros restringidos, o None si no hay ninguno
+        online: booleano
+            si las marcas se obtuvieron de la API de días festivos
+        inicio : float o None
+            instante en que empezó la consulta de feriados, o None si METRICAS está inactivo
+        Devoluciones
+        -------
+        Devuelve la máscara de registros que pueden circular
+        """
+        permitido = ~restringido
+        if marcas is not None:
+            permitido[restringido] = marcas
+            if inicio is not None:
+                METRICAS.tiempo('feriado_lote_online' if online else 'feriado_lote', time.perf_counter() - inicio)
+        if METRICAS.activo:
+            feriados = int(np.count_nonzero(permitido[restringido]))
+            METRICAS.contar('decisiones', 'feriado', feriados)
+            METRICAS.contar('decisiones', 'restringido', int(np.count_nonzero(restringido)) - feriados)
+        return permitido
+
+
+    @classmethod
+    def predecir_lote(cls, placas, fechas, tiempos, online=False):
+        """
+        Aplica predecir() a columnas completas de registros (placa, fecha, tiempo) de forma vectorizada.
+        Equivale a predecir_registros(analizar_lote(placas, fechas, tiempos), online).
+
+        Parámetros
+        ----------
+        placas : array_like de str
+            Placas con el formato XX-YYYY o XXX-YYYY
+        fechas : array_like de str
+            Fechas con el formato ISO 8601 AAAA-MM-DD
+        tiempos : array_like de str
+            Horas con el formato HH:MM
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        Devoluciones
+        -------
+        Devuelve un arreglo booleano donde cada elemento es True si el vehículo del registro
+        puede estar en la carretera, de lo contrario False
+
+        aumenta
+        ------
+        ValorError
+            Si las columnas no tienen la misma longitud o algún registro no tiene el formato esperado
+        """
+        return cls.predecir_registros(cls.analizar_lote(placas, fechas, tiempos), online)
+
+
+    @classmethod
+    async def predecir_lote_async(cls, placas, fechas, tiempos, online=True):
+        """
+        Versión asyncio de predecir_lote(). En modo online las fechas distintas se consultan de forma
+        concurrente, hasta CLIENTE_FERIADOS.concurrencia consultas a la vez.
+
+        Parámetros
+        ----------
+        placas, fechas, tiempos : array_like de str
+            Columnas con los mismos formatos que predecir_lote()
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Verdadero)
+        Devoluciones
+        -------
+        Devuelve un arreglo booleano con el mismo significado que predecir_lote()
+        """
+        if not online:
+            return cls.predecir_lote(placas, fechas, tiempos, False)
+        dias, restringido = cls.__restringidos(cls.analizar_lote(placas, fechas, tiempos))
+        inicio = time.perf_counter() if METRICAS.activo else None
+        marcas = None
+        if restringido.any():
+            unicos, inversa = np.unique(dias[restringido], return_inverse=True)
+            marcas = await asyncio.gather(*(
+                CLIENTE_FERIADOS.es_feriado_async(fecha) for fecha in unicos.astype('datetime64[D]').tolist()))
+            marcas = np.array(marcas, dtype=bool)[inversa]
+        return cls.__decidir(restringido, marcas, True, inicio)
+
+
+    @classmethod
+    def analizar_arrow(cls, lote):
+        """
+        Versión de analizar_lote() para una tabla o un lote de registros de Arrow. Las fechas date32/date64
+        y las horas time32/time64 se leen como enteros, sin convertirlas en cadenas; las columnas de texto
+        se analizan directamente desde los búferes de Arrow. Los nombres de columna son los de _COLUMNAS.
+
+        Parámetros
+        ----------
+        lote : pyarrow.Table o pyarrow.RecordBatch
+        Devoluciones
+        -------
+        Devuelve un arreglo de REGISTRO_PICO_PLACA
+
+        aumenta
+        ------
+        ValorError
+            Si falta alguna columna o algún registro no tiene el formato esperado
+        """
+        errores = []
+        validos, registros = cls.validar_arrow(lote, errores)
+        if errores:
+            raise ValueError('Registro inválido en la fila {} ({})'.format(*errores[0]))
+        return registros
+
+
+    @classmethod
+    def validar_arrow(cls, lote, errores=None, primera_fila=0):
+        """
+        Versión de validar_lote() para una tabla o un lote de registros de Arrow (ver analizar_arrow)
+
+        Devoluciones
+        -------
+        Devuelve una tupla (validos, registros) como validar_lote()
+
+        aumenta
+        ------
+        ValorError
+            Si falta alguna columna
+        """
+        inicio = time.perf_counter() if METRICAS.activo else None
+        nombres = [n.lower() for n in lote.schema.names]
+        columnas = []
+        for alias in _COLUMNAS:
+            i = next((nombres.index(n) for n in alias if n in nombres), None)
+            if i is None:
+                raise ValueError('Falta la columna {}'.format(alias[0]))
+            columna = lote.column(i)
+            columnas.append(columna.combine_chunks() if hasattr(columna, 'combine_chunks') else columna)
+        placa_ok, codigos = _analizar_placas(columnas[0])
+        fecha_ok, dias = _analizar_fechas_arrow(columnas[1])
+        tiempo_ok, minutos = _analizar_tiempos_arrow(columnas[2])
+        validos = placa_ok & fecha_ok & tiempo_ok
+        if errores is not None and not validos.all():
+            # Un registro con los tres valores nulos es ilegible
+            ilegibles = ~(_validos_arrow(columnas[0]) | _validos_arrow(columnas[1]) | _validos_arrow(columnas[2]))
+            cls.__registrar_errores(validos, ilegibles, (placa_ok, fecha_ok, tiempo_ok), errores, primera_fila)
+        registros = np.empty(len(lote), dtype=REGISTRO_PICO_PLACA)
+        registros['placa'] = codigos
+        registros['dia'] = np.where(fecha_ok, dias, 0)
+        registros['minuto'] = np.where(tiempo_ok, minutos, 0)
+        if inicio is not None:
+            METRICAS.tiempo('validacion_lote', time.perf_counter() - inicio)
+        return validos, registros
+
+
+    @classmethod
+    def predecir_arrow(cls, lote, online=False, columna='allowed', errores=None, primera_fila=0):
+        """
+        Aplica predecir() a una tabla o un lote de registros de Arrow y le añade la columna de decisiones.
+        Las columnas de entrada se conservan sin copiarlas y el mapa de bits de la columna booleana
+        nueva se entrega a Arrow sin copiarlo.
+
+        Parámetros
+        ----------
+        lote : pyarrow.Table o pyarrow.RecordBatch
+            con las columnas de placa, fecha y tiempo (ver analizar_arrow)
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        columna : str, opcional
+            nombre de la columna de decisiones (el valor predeterminado es 'allowed')
+        errores : list u objeto con extend(), opcional
+            si se indica, los registros inválidos se omiten de la salida y se informan como en validar_lote();
+            de lo contrario el primer registro inválido lanza ValueError
+        primera_fila : int, opcional
+            número de la primera fila del lote en errores (el valor predeterminado es 0)
+        Devoluciones
+        -------
+        Devuelve una tabla o lote del mismo tipo con la columna de decisiones al final
+        """
+        pa = _pyarrow()
+        if errores is None:
+            registros = cls.analizar_arrow(lote)
+        else:
+            validos, registros = cls.validar_arrow(lote, errores, primera_fila)
+            if not validos.all():
+                lote = lote.filter(pa.array(validos))
+                registros = registros[validos]
+        permitido = cls.predecir_registros(registros, online)
+        bits = np.packbits(permitido, bitorder='little')
+        decisiones = pa.Array.from_buffers(pa.bool_(), len(permitido), [None, pa.py_buffer(bits)])
+        if isinstance(lote, pa.RecordBatch):
+            return pa.RecordBatch.from_arrays(lote.columns + [decisiones], names=lote.schema.names + [columna])
+        return lote.append_column(columna, decisiones)
+
+
+    @classmethod
+    def ventanas_restriccion(cls, placa, desde, hasta, online=False):
+        """
+        Calcula los intervalos en los que el vehículo no puede circular entre dos fechas, sin evaluar minuto a minuto:
+        combina la tabla de días y dígitos y las horas pico de la ordenanza vigente con el calendario de feriados
+
+        Parámetros
+        ----------
+        placa : str
+            Placa con el formato XX-YYYY o XXX-YYYY
+        desde, hasta : datetime.date o str
+            primer y último día del rango (ambos incluidos), str con el formato AAAA-MM-DD
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        Devoluciones
+        -------
+        Devuelve un arreglo (n, 2) de datetime64[m] con el inicio y el fin (excluido) de cada intervalo, en hora local
+
+        aumenta
+        ------
+        ValorError
+            Si la placa o las fechas no tienen el formato esperado
+        """
+        return cls.ventanas_restriccion_flota([placa], desde, hasta, online)[placa]
+
+
+    @classmethod
+    def ventanas_restriccion_flota(cls, placas, desde, hasta, online=False):
+        """
+        ventanas_restriccion() para varias placas: los intervalos se calculan una sola vez por combinación de
+        último dígito y clase de exención, y las placas equivalentes comparten el mismo arreglo
+
+        Parámetros
+        ----------
+        placas : iterable de str
+        desde, hasta : datetime.date o str
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        Devoluciones
+        -------
+        Devuelve un dict {placa: arreglo (n, 2) de datetime64[m]}
+        """
+        rango = [_dia_de_fecha(fecha) if isinstance(fecha, str) else fecha.toordinal() - _EPOCA
+                 for fecha in (desde, hasta)]
+        if rango[1] < rango[0]:
+            raise ValueError('La fecha final debe ser igual o posterior a la inicial')
+        placas = list(dict.fromkeys(placas))
+        validas, codigos = _analizar_placas(placas)
+        if not validas.all():
+            _validar_placa(placas[int(np.argmin(validas))])
+
+        dias = np.arange(rango[0], rango[1] + 1, dtype=np.int64)
+        semana = (dias + 3) % 7
+        versiones = MOTOR_RESTRICCIONES.versiones_lote(dias)
+        claves = [_campos_placa(codigo) for codigo in codigos.tolist()]
+        # Primero se reúnen las (versión, día de la semana, intervalos) de cada combinación de dígito y clase
+        # y los días con alguna restricción, para consultar los feriados solo de esos días
+        planes, restringido = {}, np.zeros(dias.shape, dtype=bool)
+        for digito, clase in dict.fromkeys(claves):
+            plan = []
+            for v in np.unique(versiones).tolist():
+                regla = MOTOR_RESTRICCIONES.reglas[v]
+                if regla.exentas[clase]:
+                    continue
+                for dia_semana in range(7):
+                    intervalos = regla.intervalos(dia_semana, digito)
+                    if intervalos:
+                        plan.append((v, dia_semana, intervalos))
+                        restringido |= (versiones == v) & (semana == dia_semana)
+            planes[digito, clase] = plan
+        # Los feriados se resuelven una sola vez para toda la flota
+        feriado = np.zeros(dias.shape, dtype=bool)
+        if restringido.any():
+            feriado[restringido] = cls.__feriados_lote(dias[restringido], online)
+        calculados = {}
+        for clave, plan in planes.items():
+            inicios = []
+            for v, dia_semana, intervalos in plan:
+                base = dias[(versiones == v) & (semana == dia_semana) & ~feriado] * 1440
+                inicios.extend(np.stack((base + a, base + b), axis=1) for a, b in intervalos)
+            if inicios:
+                ventanas = np.concatenate(inicios)
+                ventanas = ventanas[np.argsort(ventanas[:, 0], kind='stable')]
+            else:
+                ventanas = np.zeros((0, 2), dtype=np.int64)
+            calculados[clave] = ventanas.astype('datetime64[m]')
+        return {placa: calculados[clave] for placa, clave in zip(placas, claves)}
+
+
+class FlotaPicoPlaca:
+    """
+    Índice invertido de una flota de vehículos para responder "¿qué placas están restringidas en la
+    fecha y hora T?" sin recorrer toda la flota.
+    ...
+    Las placas se registran una sola vez y se agrupan por último dígito y clase de exención (ver _campos_placa).
+    Una consulta resuelve una sola vez el feriado y el minuto de la semana, y recorre solo los grupos
+    restringidos, por lo que su costo es proporcional al número de placas devueltas.
+    ...
+    Métodos
+    -------
+    agregar(self, placas):
+        Registra placas en la flota
+    quitar(self, placas):
+        Elimina placas de la flota
+    restringidos(self, fecha, tiempo, online=False):
+        Devuelve las placas de la flota que no pueden circular en la fecha y hora dadas
+    """
+    def __init__(self, placas=()):
+        """
+        Parámetros
+        ----------
+        placas : iterable de str, opcional
+            placas con el formato XX-YYYY o XXX-YYYY registradas inicialmente
+        """
+        # Un grupo por combinación (dígito, clase): dict usado como conjunto ordenado de placas
+        self._grupos = [{} for _ in range(10 * 52)]
+        # Clases con al menos una placa para cada dígito
+        self._clases = [set() for _ in range(10)]
+        self._placas = {}
+        self.agregar(placas)
+
+    def __len__(self):
+        return len(self._placas)
+
+    def __contains__(self, placa):
+        return placa in self._placas
+
+    def __iter__(self):
+        return iter(self._placas)
+
+    def agregar(self, placas):
+        """
+        Registra placas en la flota; las placas ya registradas se ignoran
+
+        Parámetros
+        ----------
+        placas : iterable de str
+        Devoluciones
+        -------
+        Devuelve el número de placas nuevas
+
+        aumenta
+        ------
+        ValorError
+            Si alguna placa no tiene el formato esperado (en ese caso no se registra ninguna)
+        """
+        nuevas = [placa for placa in dict.fromkeys(placas) if placa not in self._placas]
+        validas, codigos = _analizar_placas(nuevas)
+        if not validas.all():
+            _validar_placa(nuevas[int(np.argmin(validas))])
+        digitos, clases = _campos_placa(codigos)
+        for placa, digito, clase in zip(nuevas, digitos.tolist(), clases.tolist()):
+            grupo = digito * 52 + clase
+            self._grupos[grupo][placa] = None
+            self._clases[digito].add(clase)
+            self._placas[placa] = grupo
+        return len(nuevas)
+
+    def quitar(self, placas):
+        """
+        Elimina placas de la flota; las placas no registradas se ignoran
+
+        Parámetros
+        ----------
+        placas : iterable de str
+        Devoluciones
+        -------
+        Devuelve el número de placas eliminadas
+        """
+        total = 0
+        for placa in placas:
+            grupo = self._placas.pop(placa, None)
+            if grupo is None:
+                continue
+            del self._grupos[grupo][placa]
+            if not self._grupos[grupo]:
+                self._clases[grupo // 52].discard(grupo % 52)
+            total += 1
+        return total
+
+    def restringidos(self, fecha, tiempo, online=False):
+        """
+        Devuelve las placas de la flota que no pueden circular en la fecha y hora dadas
+
+        Parámetros
+        ----------
+        fecha : str
+            con el formato AAAA-MM-DD
+        tiempo : str
+            con el formato HH:MM
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        Devoluciones
+        -------
+        Devuelve una lista de placas, agrupadas por dígito y clase y en orden de registro dentro de cada grupo
+
+        aumenta
+        ------
+        ValorError
+            Si la fecha o el tiempo no tienen el formato esperado
+        """
+        dia, minuto = _dia_de_fecha(fecha), _minuto_del_dia(tiempo)
+        regla = MOTOR_RESTRICCIONES.regla(dia)
+        bits = int(regla.mapa[(dia + 3) % 7 * 1440 + minuto])
+        if not bits or not self._placas:
+            return []
+        fecha = datetime.date.fromordinal(dia + _EPOCA)
+        if CLIENTE_FERIADOS.es_feriado(fecha) if online else CACHE_FERIADOS.es_feriado(fecha):
+            return []
+        grupos = []
+        for digito in range(10):
+            if bits >> digito & 1:
+                grupos.extend(self._grupos[digito * 52 + clase]
+                              for clase in self._clases[digito] if not regla.exentas[clase])
+        return list(itertools.chain.from_iterable(grupos))
+
+
+# Nombres de columna aceptados en la entrada (inglés y español) para placa, fecha y tiempo
+_COLUMNAS = (('plate', 'placa'), ('date', 'fecha'), ('time', 'tiempo', 'hora'))
+
+
+def _indices_encabezado(fila):
+    """
+    Devuelve las posiciones de placa, fecha y tiempo si la fila CSV es un encabezado con los nombres
+    de _COLUMNAS, o None si la fila es un registro
+
+    aumenta
+    ------
+    ValorError
+        Si la fila es un encabezado (nombra la placa) pero le falta la columna de fecha o de tiempo
+    """
+    nombres = [c.strip().lower() for c in fila]
+    if not any(n in nombres for n in _COLUMNAS[0]):
+        return None
+    indices = []
+    for alias in _COLUMNAS:
+        indice = next((nombres.index(n) for n in alias if n in nombres), None)
+        if indice is None:
+            raise ValueError('Al encabezado CSV le falta la columna {}'.format(' / '.join(alias)))
+        indices.append(indice)
+    return indices
+
+
+def _registros_csv(lineas, indices=None):
+    """
+    Genera tuplas (placa, fecha, tiempo) a partir de líneas CSV.
+    Si no se dan los índices de las columnas y la primera fila es un encabezado con los nombres de _COLUMNAS,
+    este se usa para ubicar las columnas; de lo contrario se toman las tres primeras columnas en orden.
+    Las columnas que faltan en una fila se devuelven vacías.
+    """
+    lector = csv.reader(lineas)
+    if indices is None:
+        primera = next(lector, None)
+        if primera is None:
+            return
+        indices = _indices_encabezado(primera)
+        if indices is None:
+            indices = [0, 1, 2]
+            lector = itertools.chain([primera], lector)
+    for fila in lector:
+        if fila:
+            yield tuple(fila[i].strip() if i < len(fila) else '' for i in indices)
+
+
+def _registros_jsonl(lineas):
+    """
+    Genera tuplas (placa, fecha, tiempo) a partir de líneas JSON con un objeto por línea.
+    Los campos que faltan o que no son texto ni números se devuelven vacíos, y las líneas que no son un objeto
+    JSON como tres campos vacíos.
+    """
+    for linea in lineas:
+        if linea.strip():
+            try:
+                objeto = json.loads(linea)
+            except ValueError:
+                objeto = None
+            if not isinstance(objeto, dict):
+                yield '', '', ''
+                continue
+            valores = (next((objeto[n] for n in alias if n in objeto), '') for alias in _COLUMNAS)
+            yield tuple(v if isinstance(v, (str, int, float)) else '' for v in valores)
+
+
+def leer_registros(ruta, formato=None):
+    """
+    Lee registros (placa, fecha, tiempo) de un archivo CSV o JSONL de forma incremental
+
+    Parámetros
+    ----------
+    ruta : str
+        ruta del archivo, o '-' para la entrada estándar
+    formato : str, opcional
+        'csv' o 'jsonl'; si es None se deduce de la extensión del archivo o de la primera línea
+    Devoluciones
+    -------
+    Generador de tuplas (placa, fecha, tiempo)
+    """
+    if ruta == '-':
+        archivo = sys.stdin
+    else:
+        if formato is None:
+            extension = os.path.splitext(ruta)[1].lower()
+            formato = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension)
+        archivo = open(ruta, newline='', encoding='utf-8')
+    try:
+        lineas = iter(archivo)
+        if formato is None:
+            primera = next(lineas, None)
+            if primera is None:
+                return
+            formato = 'jsonl' if primera.lstrip().startswith('{') else 'csv'
+            lineas = itertools.chain([primera], lineas)
+        if formato == 'jsonl':
+            yield from _registros_jsonl(lineas)
+        else:
+            yield from _registros_csv(lineas)
+    finally:
+        if archivo is not sys.stdin:
+            archivo.close()
+
+
+def predecir_flujo(registros, online=False, tamano_bloque=4096, errores=None):
+    """
+    Aplica PicoPlaca.predecir_lote a un flujo de registros por bloques, con memoria constante
+
+    Parámetros
+    ----------
+    registros : iterable de tuplas (placa, fecha, tiempo)
+    online: booleano, opcional
+        si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+    tamano_bloque : int, opcional
+        número de registros evaluados juntos (el valor predeterminado es 4096)
+    errores : list u objeto con extend(), opcional
+        si se indica, los registros inválidos se omiten y se informan como tuplas (fila, motivo), con la fila
+        contada desde 0 en todo el flujo (ver PicoPlaca.validar_lote); de lo contrario el primer registro
+        inválido lanza ValueError
+    Devoluciones
+    -------
+    Generador de tuplas (placa, fecha, tiempo, puede_circular) en el orden de entrada
+    """
+    registros = iter(registros)
+    fila = 0
+    while True:
+        bloque = list(itertools.islice(registros, tamano_bloque))
+        if not bloque:
+            return
+        placas, fechas, tiempos = zip(*bloque)
+        if errores is None:
+            decisiones = PicoPlaca.predecir_lote(placas, fechas, tiempos, online)
+        else:
+            validos, registros_bloque = PicoPlaca.validar_lote(placas, fechas, tiempos, errores, fila)
+            decisiones = PicoPlaca.predecir_registros(registros_bloque[validos], online)
+            bloque = itertools.compress(bloque, validos.tolist())
+        for registro, decision in zip(bloque, decisiones.tolist()):
+            yield registro + (decision,)
+        fila += len(placas)
+
+
+def _formatear_decisiones(decisiones, formato='csv'):
+    """
+    Formatea decisiones como texto, una por línea y sin encabezado
+
+    Parámetros
+    ----------
+    decisiones : iterable de tuplas (placa, fecha, tiempo, puede_circular)
+    formato : str, opcional
+        'csv' o 'jsonl' (el valor predeterminado es 'csv')
+    """
+    buffer = io.StringIO()
+    if formato == 'jsonl':
+        for placa, fecha, tiempo, decision in decisiones:
+            buffer.write(json.dumps({'plate': placa, 'date': fecha, 'time': tiempo, 'allowed': decision}) + '\n')
+    else:
+        escritor = csv.writer(buffer, lineterminator='\n')
+        escritor.writerows((placa, fecha, tiempo, 'true' if decision else 'false')
+                           for placa, fecha, tiempo, decision in decisiones)
+    return buffer.getvalue()
+
+
+# Encabezado de la salida CSV
+_ENCABEZADO_CSV = 'plate,date,time,allowed\n'
+
+
+def escribir_decisiones(decisiones, salida, formato='csv', tamano_bloque=4096):
+    """
+    Escribe una decisión por línea, vaciando la salida cada tamano_bloque decisiones
+
+    Parámetros
+    ----------
+    decisiones : iterable de tuplas (placa, fecha, tiempo, puede_circular)
+    salida : archivo de texto
+    formato : str, opcional
+        'csv' (con encabezado plate,date,time,allowed) o 'jsonl' (el valor predeterminado es 'csv')
+    tamano_bloque : int, opcional
+        número de líneas acumuladas antes de escribir y vaciar la salida (el valor predeterminado es 4096)
+    Devoluciones
+    -------
+    Devuelve el número de decisiones escritas
+    """
+    total = 0
+    if formato == 'csv':
+        salida.write(_ENCABEZADO_CSV)
+    decisiones = iter(decisiones)
+    while True:
+        bloque = list(itertools.islice(decisiones, tamano_bloque))
+        if not bloque:
+            break
+        salida.write(_formatear_decisiones(bloque, formato))
+        salida.flush()
+        total += len(bloque)
+    salida.flush()
+    return total
+
+
+# Formatos columnares (requieren pyarrow) y sus extensiones de archivo
+_FORMATOS_COLUMNARES = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'arrow', '.feather': 'arrow',
+                        '.ipc': 'arrow'}
+
+
+def formato_columnar(ruta, formato=None):
+    """Devuelve 'parquet' o 'arrow' si el archivo (o el formato dado) es columnar, de lo contrario None"""
+    if formato is not None:
+        return formato if formato in ('parquet', 'arrow') else None
+    return _FORMATOS_COLUMNARES.get(os.path.splitext(ruta)[1].lower())
+
+
+def leer_lotes_arrow(ruta, formato=None, tamano_bloque=65536):
+    """
+    Lee un archivo Parquet o Arrow IPC (archivo o flujo) por lotes de registros, con memoria acotada
+
+    Parámetros
+    ----------
+    ruta : str
+        ruta del archivo, o '-' para la entrada estándar (flujo Arrow IPC, o Parquet leído completo en memoria)
+    formato : str, opcional
+        'parquet' o 'arrow'; si es None se deduce de la extensión del archivo
+    tamano_bloque : int, opcional
+        registros por lote al leer Parquet (el valor predeterminado es 65536)
+    Devoluciones
+    -------
+    Generador de pyarrow.RecordBatch
+    """
+    pa = _pyarrow()
+    formato = formato_columnar(ruta, formato)
+    if ruta == '-' and formato == 'parquet':
+        # Parquet necesita acceso aleatorio: la entrada estándar se lee completa en memoria
+        yield from pa.parquet.ParquetFile(pa.BufferReader(sys.stdin.buffer.read())).iter_batches(
+            batch_size=tamano_bloque)
+    elif ruta == '-':
+        yield from pa.ipc.open_stream(sys.stdin.buffer)
+    elif formato == 'parquet':
+        yield from pa.parquet.ParquetFile(ruta).iter_batches(batch_size=tamano_bloque)
+    else:
+        with pa.memory_map(ruta) as fuente:
+            try:
+                lector = pa.ipc.open_file(fuente)
+            except pa.ArrowInvalid:
+                fuente.seek(0)
+                yield from pa.ipc.open_stream(fuente)
+            else:
+                for i in range(lector.num_record_batches):
+                    yield lector.get_batch(i)
+
+
+def escribir_lotes_arrow(lotes, salida, formato='parquet'):
+    """
+    Escribe lotes de registros de Arrow en formato Parquet o como flujo Arrow IPC.
+    Los lotes posteriores se convierten al esquema del primero.
+
+    Parámetros
+    ----------
+    lotes : iterable de pyarrow.RecordBatch
+    salida : archivo binario o ruta
+    formato : str, opcional
+        'parquet' o 'arrow' (el valor predeterminado es 'parquet')
+    Devoluciones
+    -------
+    Devuelve el número de registros escritos
+    """
+    pa = _pyarrow()
+    escritor = None
+    total = 0
+    try:
+        for lote in lotes:
+            if escritor is None:
+                esquema = lote.schema
+                escritor = (pa.parquet.ParquetWriter(salida, esquema) if formato == 'parquet'
+                            else pa.ipc.new_stream(salida, esquema))
+            elif lote.schema != esquema:
+                lote = pa.Table.from_batches([lote]).cast(esquema).combine_chunks().to_batches()[0]
+            escritor.write_batch(lote)
+            total += len(lote)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+
+# Diferencia de la hora de Quito con UTC en minutos (Ecuador continental no usa horario de verano)
+_DESFASE_QUITO = -5 * 60
+
+
+def _formatear_ventanas(placa, ventanas, formato, sello):
+    """
+    Formatea los intervalos de una placa como objetos JSON o eventos VEVENT, uno por intervalo
+    """
+    if not len(ventanas):
+        return ''
+    if formato == 'ics':
+        utc = ventanas - np.timedelta64(_DESFASE_QUITO, 'm')
+        textos = np.datetime_as_string(utc, unit='s').tolist()
+        plantilla = ('BEGIN:VEVENT\r\nUID:%s-%%d@pico-placa\r\nDTSTAMP:%s\r\nDTSTART:%%sZ\r\nDTEND:%%sZ\r\n'
+                     'SUMMARY:Pico y Placa %s\r\nTRANSP:TRANSPARENT\r\nEND:VEVENT\r\n' % (placa, sello, placa))
+        return ''.join(
+            plantilla % (inicio, inicio_utc.translate(_SIN_SEPARADORES), fin_utc.translate(_SIN_SEPARADORES))
+            for inicio, (inicio_utc, fin_utc) in zip(ventanas[:, 0].astype(np.int64).tolist(), textos))
+    textos = np.datetime_as_string(ventanas, unit='s').tolist()
+    zona = '{:+03d}:{:02d}'.format(_DESFASE_QUITO // 60, abs(_DESFASE_QUITO) % 60)
+    # Las placas ya están validadas, por lo que no requieren escape JSON
+    plantilla = ',\n{"plate": "%s", "start": "%%s%s", "end": "%%s%s"}' % (placa, zona, zona)
+    return ''.join(plantilla % (inicio, fin) for inicio, fin in textos)
+
+
+# Tabla para quitar guiones y dos puntos de las fechas ISO en los eventos iCalendar
+_SIN_SEPARADORES = str.maketrans('', '', '-:')
+
+
+def escribir_ventanas(ventanas, salida, formato='json'):
+    """
+    Escribe los intervalos de restricción de ventanas_restriccion_flota()
+
+    Parámetros
+    ----------
+    ventanas : dict {placa: arreglo (n, 2) de datetime64[m]}
+        intervalos en hora local de Quito
+    salida : archivo de texto
+    formato : str, opcional
+        'json' (lista de objetos plate, start, end con el desfase -05:00) o 'ics' (calendario iCalendar con
+        los eventos en UTC) (el valor predeterminado es 'json')
+    Devoluciones
+    -------
+    Devuelve el número de intervalos escritos
+    """
+    total = 0
+    if formato == 'ics':
+        sello = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        salida.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//U1Lab4//Pico y Placa Quito//ES\r\n'
+                     'CALSCALE:GREGORIAN\r\n')
+    else:
+        sello = None
+        salida.write('[')
+    primero = True
+    for placa, intervalos in ventanas.items():
+        texto = _formatear_ventanas(placa, intervalos, formato, sello)
+        if not texto:
+            continue
+        if formato != 'ics' and primero:
+            # Sin coma antes del primer objeto de la lista
+            texto = texto[1:]
+        primero = False
+        salida.write(texto)
+        total += len(intervalos)
+    salida.write('END:VCALENDAR\r\n' if formato == 'ics' else '\n]\n')
+    salida.flush()
+    return total
+
+
+def _fragmentos(ruta, inicio, tamano):
+    """
+    Divide un archivo en rangos de bytes [inicio, fin) de aproximadamente tamano bytes,
+    alineados al final de una línea
+    """
+    total = os.path.getsize(ruta)
+    with open(ruta, 'rb') as archivo:
+        while inicio < total:
+            fin = min(inicio + tamano, total)
+            if fin < total:
+                archivo.seek(fin)
+                archivo.readline()
+                fin = archivo.tell()
+            yield inicio, fin
+            inicio = fin
+
+
+def _iniciar_trabajador():
+    """Inicializa un proceso trabajador: abre el índice de feriados una sola vez por proceso"""
+    CACHE_FERIADOS.indice()
+
+
+def _procesar_fragmento(tarea):
+    """
+    Evalúa los registros de un rango de bytes de un archivo en un proceso trabajador
+
+    Parámetros
+    ----------
+    tarea : tuple
+        (ruta, inicio, fin, formato, indices, online, formato_salida, omitir_invalidos)
+    Devoluciones
+    -------
+    Devuelve el arreglo de decisiones, o el texto formateado si formato_salida no es None; si omitir_invalidos
+    es Verdadero, devuelve una tupla (resultado, errores, registros) con los errores numerados desde
+    el inicio del fragmento y el número de registros leídos
+    """
+    ruta, inicio, fin, formato, indices, online, formato_salida, omitir_invalidos = tarea
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        # Mismos cortes de línea que leer_registros() (newline=''), no los de str.splitlines()
+        lineas = io.StringIO(archivo.read(fin - inicio).decode('utf-8'), newline='')
+    if formato == 'jsonl':
+        registros = list(_registros_jsonl(lineas))
+    else:
+        registros = list(_registros_csv(lineas, indices))
+    errores = [] if omitir_invalidos else None
+    leidos = len(registros)
+    if registros:
+        placas, fechas, tiempos = zip(*registros)
+        if errores is None:
+            decisiones = PicoPlaca.predecir_lote(placas, fechas, tiempos, online)
+        else:
+            validos, analizados = PicoPlaca.validar_lote(placas, fechas, tiempos, errores)
+            decisiones = PicoPlaca.predecir_registros(analizados[validos], online)
+            registros = list(itertools.compress(registros, validos.tolist()))
+    else:
+        decisiones = np.zeros(0, dtype=bool)
+    if formato_salida is None:
+        resultado = decisiones
+    else:
+        resultado = _formatear_decisiones(
+            (registro + (decision,) for registro, decision in zip(registros, decisiones.tolist())), formato_salida)
+    return resultado if errores is None else (resultado, errores, leidos)
+
+
+def _mapa_acotado(grupo, funcion, tareas, ventana):
+    """
+    Como grupo.map(funcion, tareas), pero con como mucho ventana tareas enviadas y sin consumir:
+    las tareas se envían a medida que se consumen los resultados, en orden. Al cerrar el generador
+    se cancelan las tareas que no han empezado.
+    """
+    pendientes = deque()
+    try:
+        for tarea in tareas:
+            pendientes.append(grupo.submit(funcion, tarea))
+            if len(pendientes) >= ventana:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+    finally:
+        for futuro in pendientes:
+            futuro.cancel()
+
+
+def predecir_archivo_paralelo(ruta, trabajadores=None, formato=None, online=False, formato_salida=None,
+                              tamano_fragmento=1 << 22, errores=None):
+    """
+    Evalúa un archivo CSV o JSONL en un grupo de procesos. El archivo se divide en fragmentos de bytes
+    alineados a los registros; cada trabajador inicializa los calendarios de feriados una sola vez
+    y los resultados se devuelven en el orden del archivo. Solo hay dos fragmentos por trabajador
+    en curso o esperando a ser consumidos, de modo que la memoria no crece con el tamaño del archivo.
+
+    Parámetros
+    ----------
+    ruta : str
+        archivo de entrada (no se admite la entrada estándar)
+    trabajadores : int, opcional
+        número de procesos (por defecto el número de núcleos)
+    formato : str, opcional
+        'csv' o 'jsonl'; si es None se deduce de la extensión o de la primera línea
+    online: booleano, opcional
+        si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso);
+        solo se admite con un trabajador, porque cada proceso tiene su propio límite de tasa y escribe
+        en la misma caché en disco
+    formato_salida : str, opcional
+        'csv' o 'jsonl' para recibir las decisiones ya formateadas (sin encabezado)
+    tamano_fragmento : int, opcional
+        tamaño aproximado en bytes de cada fragmento (el valor predeterminado es 4 MiB)
+    errores : list u objeto con extend(), opcional
+        si se indica, los registros inválidos se omiten y se informan como en predecir_flujo()
+    Devoluciones
+    -------
+    Generador que produce, por cada fragmento y en orden, un arreglo booleano de decisiones
+    o su texto formateado si se indicó formato_salida
+
+    aumenta
+    ------
+    ValorError
+        Si la ruta es la entrada estándar, o si online es Verdadero con más de un trabajador
+    """
+    if ruta == '-':
+        raise ValueError('El procesamiento en paralelo requiere un archivo, no la entrada estándar')
+    if online and trabajadores != 1:
+        raise ValueError('El modo online no admite más de un trabajador: cada proceso excedería el límite de tasa '
+                         'de la API')
+    with open(ruta, 'rb') as archivo:
+        primera = archivo.readline()
+    if formato is None:
+        extension = os.path.splitext(ruta)[1].lower()
+        formato = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension)
+        if formato is None:
+            formato = 'jsonl' if primera.lstrip().startswith(b'{') else 'csv'
+    inicio, indices = 0, None
+    if formato == 'csv':
+        indices = _indices_encabezado(next(csv.reader([primera.decode('utf-8')]), []))
+        if indices is None:
+            indices = [0, 1, 2]
+        else:
+            inicio = len(primera)
+    tareas = ((ruta, a, b, formato, indices, online, formato_salida, errores is not None)
+              for a, b in _fragmentos(ruta, inicio, tamano_fragmento))
+    with concurrent.futures.ProcessPoolExecutor(trabajadores, initializer=_iniciar_trabajador) as grupo:
+        # Dos fragmentos por trabajador mantienen ocupado el grupo sin acumular en memoria todo el archivo
+        resultados = _mapa_acotado(grupo, _procesar_fragmento, tareas, 2 * (trabajadores or os.cpu_count() or 1))
+        if errores is None:
+            yield from resultados
+            return
+        fila = 0
+        for resultado, errores_fragmento, leidos in resultados:
+            errores.extend((fila + i, motivo) for i, motivo in errores_fragmento)
+            fila += leidos
+            yield resultado
+
+
+class ServidorPicoPlaca:
+    """
+    Servidor local de predicciones que mantiene calientes en memoria los calendarios de feriados,
+    las ordenanzas compiladas y el cliente de la API de feriados.
+    Atiende HTTP/1.1 (keep-alive y pipelining) en TCP y JSON por líneas en un socket Unix.
+    ...
+    Consultas
+    ----------
+    individual : {"plate": "PBX-1234", "date": "2022-05-16", "time": "08:00"}
+        respuesta {"allowed": false}
+    lote : {"records": [{"plate": ..., "date": ..., "time": ...}, ...]}
+        respuesta {"allowed": [true, false, ...]}
+    Los nombres de campo en español (placa, fecha, tiempo) también se aceptan.
+    Los errores se responden como {"error": "..."} (con estado 400 en HTTP).
+    Rutas HTTP
+    ----------
+    POST /predict : consulta individual o por lote
+    GET /health : {"ok": true}
+    GET /stats : métricas del proceso (METRICAS.estadisticas())
+    GET /metrics : métricas en el formato de texto de Prometheus
+    Métodos
+    -------
+    responder(self, consulta):
+        Evalúa una consulta ya decodificada y devuelve la respuesta como dict
+    iniciar(self):
+        Abre los sockets configurados
+    servir(self):
+        Abre los sockets y atiende conexiones hasta que se cancele
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=8080, socket_unix=None, online=False):
+        """
+        Construye el servidor.
+
+        Parámetros
+        ----------
+        host : str, opcional
+            dirección TCP (el valor predeterminado es 127.0.0.1); None desactiva HTTP
+        puerto : int, opcional
+            puerto TCP (el valor predeterminado es 8080; 0 elige uno libre)
+        socket_unix : str, opcional
+            ruta del socket Unix para JSON por líneas
+        online: booleano, opcional
+            si online == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        """
+        self.host = host
+        self.puerto = puerto
+        self.socket_unix = socket_unix
+        self.online = online
+        self.servidores = []
+
+    def calentar(self, anios=None):
+        """
+        Carga en memoria los calendarios de feriados de los años dados
+
+        Parámetros
+        ----------
+        anios : iterable de int, opcional
+            por defecto el año actual, el anterior y el siguiente
+        """
+        actual = datetime.date.today().year
+        for anio in anios or (actual - 1, actual, actual + 1):
+            CACHE_FERIADOS.mapa(anio)
+
+    async def responder(self, consulta):
+        """
+        Evalúa una consulta individual o por lote
+
+        Parámetros
+        ----------
+        consulta : dict
+        Devoluciones
+        -------
+        Devuelve un dict con la clave allowed o con la clave error
+        """
+        try:
+            if isinstance(consulta, dict) and 'records' in consulta:
+                if not isinstance(consulta['records'], list):
+                    raise TypeError('records debe ser una lista de objetos JSON')
+                registros = [self._campos(r) for r in consulta['records']]
+                if not registros:
+                    return {'allowed': []}
+                placas, fechas, tiempos = zip(*registros)
+                if self.online:
+                    decisiones = await PicoPlaca.predecir_lote_async(placas, fechas, tiempos, True)
+                else:
+                    decisiones = PicoPlaca.predecir_lote(placas, fechas, tiempos)
+                return {'allowed': decisiones.tolist()}
+            pyp = PicoPlaca(*self._campos(consulta), self.online)
+            return {'allowed': await pyp.predecir_async() if self.online else pyp.predecir()}
+        except KeyError as error:
+            return {'error': error.args[0]}
+        except (ValueError, TypeError, requests.RequestException) as error:
+            return {'error': str(error) or type(error).__name__}
+
+    @staticmethod
+    def _campos(objeto):
+        """
+        Devuelve la tupla (placa, fecha, tiempo) de una consulta o de un registro de un lote
+
+        aumenta
+        ------
+        TypeError
+            Si el objeto no es un dict (un objeto JSON)
+        KeyError
+            Si falta alguno de los campos
+        """
+        if not isinstance(objeto, dict):
+            raise TypeError('Se esperaba un objeto JSON, no {}'.format(type(objeto).__name__))
+        campos = []
+        for alias in _COLUMNAS:
+            for nombre in alias:
+                if nombre in objeto:
+                    campos.append(objeto[nombre])
+                    break
+            else:
+                raise KeyError('falta el campo {}'.format(alias[0]))
+        return tuple(campos)
+
+    async def _atender_http(self, lector, escritor):
+        """Atiende una conexión HTTP/1.1; las solicitudes encadenadas se responden en orden"""
+        try:
+            while True:
+                try:
+                    cabecera = await lector.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lineas = cabecera.decode('latin-1').split('\r\n')
+                metodo, ruta, version = (lineas[0].split(' ') + ['', '', ''])[:3]
+                campos = {}
+                for linea in lineas[1:]:
+                    if ':' in linea:
+                        nombre, valor = linea.split(':', 1)
+                        campos[nombre.strip().lower()] = valor.strip()
+                cuerpo = await lector.readexactly(int(campos.get('content-length', 0)))
+                conexion = campos.get('connection', '').lower()
+                mantener = conexion != 'close' and (version == 'HTTP/1.1' or conexion == 'keep-alive')
+
+                estado = 200
+                if ruta == '/predict' and metodo == 'POST':
+                    try:
+                        respuesta = await self.responder(json.loads(cuerpo))
+                    except ValueError as error:
+                        respuesta = {'error': 'JSON inválido: {}'.format(error)}
+                    except Exception as error:
+                        # Un error inesperado responde 500 sin cerrar la conexión ni perder las solicitudes encadenadas
+                        estado = 500
+                        respuesta = {'error': 'Error interno: {}'.format(str(error) or type(error).__name__)}
+                    if 'error' in respuesta and estado == 200:
+                        estado = 400
+                elif ruta == '/health' and metodo == 'GET':
+                    respuesta = {'ok': True}
+                elif ruta == '/stats' and metodo == 'GET':
+                    respuesta = METRICAS.estadisticas()
+                elif ruta == '/metrics' and metodo == 'GET':
+                    respuesta = METRICAS.prometheus()
+                else:
+                    estado, respuesta = 404, {'error': 'Ruta no encontrada: {} {}'.format(metodo, ruta)}
+
+                if isinstance(respuesta, str):
+                    tipo, datos = 'text/plain; version=0.0.4', respuesta.encode('utf-8')
+                else:
+                    tipo, datos = 'application/json', json.dumps(respuesta).encode('utf-8')
+                razon = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[estado]
+                escritor.write('HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n{}\r\n'.format(
+                    estado, razon, tipo, len(datos),
+                    'Connection: keep-alive\r\n' if mantener else 'Connection: close\r\n').encode('latin-1') + datos)
+                await escritor.drain()
+                if not mantener:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            return
+        finally:
+            escritor.close()
+
+    async def _atender_lineas(self, lector, escritor):
+        """Atiende una conexión del socket Unix: una consulta JSON por línea y una respuesta por línea"""
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    return
+                if not linea.strip():
+                    continue
+                try:
+                    respuesta = await self.responder(json.loads(linea))
+                except ValueError as error:
+                    respuesta = {'error': 'JSON inválido: {}'.format(error)}
+                except Exception as error:
+                    respuesta = {'error': 'Error interno: {}'.format(str(error) or type(error).__name__)}
+                escritor.write(json.dumps(respuesta).encode('utf-8') + b'\n')
+                await escritor.drain()
+        except ConnectionError:
+            return
+        finally:
+            escritor.close()
+
+    async def iniciar(self):
+        """Abre los sockets configurados"""
+        self.calentar()
+        if self.host is not None:
+            servidor = await asyncio.start_server(self._atender_http, self.host, self.puerto)
+            self.puerto = servidor.sockets[0].getsockname()[1]
+            self.servidores.append(servidor)
+        if self.socket_unix:
+            if os.path.exists(self.socket_unix):
+                os.unlink(self.socket_unix)
+            self.servidores.append(await asyncio.start_unix_server(self._atender_lineas, self.socket_unix))
+
+    async def servir(self):
+        """Abre los sockets y atiende conexiones hasta que se cancele"""
+        await self.iniciar()
+        try:
+            await asyncio.gather(*(servidor.serve_forever() for servidor in self.servidores))
+        finally:
+            for servidor in self.servidores:
+                servidor.close()
+            if self.socket_unix and os.path.exists(self.socket_unix):
+                os.unlink(self.socket_unix)
+
+
+def _informar_invalidos(errores):
+    """Escribe en la salida de errores los registros omitidos por --skip-invalid, como pares (ruta, errores)"""
+    if errores is None:
+        return
+    total = 0
+    for ruta, lista in errores:
+        for fila, motivo in lista:
+            print('{}: fila {}: {}'.format(ruta, fila, motivo), file=sys.stderr)
+        total += len(lista)
+    if total:
+        print('{} registros inválidos omitidos'.format(total), file=sys.stderr)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Predictor Pico y Placa Quito: Verifique si el vehículo con la placa proporcionada puede estar en la carretera en la fecha y hora proporcionada')
+    parser.add_argument(
+        '-o',
+        '--online',
+        action='store_true',
+        help='use abstract\'s Public Holidays API')
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=CLIENTE_FERIADOS.plazo,
+        metavar='SEGUNDOS',
+        help='plazo máximo de cada consulta a la API en modo --online antes de usar el calendario local '
+             '(por defecto {} s)'.format(CLIENTE_FERIADOS.plazo))
+    parser.add_argument(
+        '--no-fallback',
+        action='store_true',
+        help='en modo --online, falla en lugar de usar el calendario local cuando la API no responde')
+    parser.add_argument(
+        '-p',
+        '--plate',
+        help='la placa del vehículo: XXX-YYYY o XX-YYYY, donde X es una letra mayúscula e Y es un dígito')
     parser.add_argument(
         '-d',
         '--date',
-        required=True,
         help='la fecha a comprobar: AAAA-MM-DD')
     parser.add_argument(
         '-t',
         '--time',
-        required=True,
         help='la hora a comprobar: HH:MM')
+    parser.add_argument(
+        '-i',
+        '--input',
+        nargs='+',
+        metavar='ARCHIVO',
+        help='archivos CSV, JSONL, Parquet o Arrow con registros placa, fecha y hora ("-" para la entrada estándar)')
+    parser.add_argument(
+        '--format',
+        choices=('csv', 'jsonl', 'parquet', 'arrow'),
+        help='formato de la entrada y la salida de --input (por defecto la entrada se deduce de la extensión o del contenido, y la salida es JSONL solo si todos los archivos son .jsonl/.ndjson); '
+             'parquet y arrow requieren pyarrow, escriben en la salida estándar binaria y conservan las columnas de entrada')
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=4096,
+        help='registros evaluados y escritos por bloque en el modo --input (por defecto 4096)')
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=1,
+        help='procesos usados para evaluar los archivos de --input (por defecto 1)')
+    parser.add_argument(
+        '--skip-invalid',
+        action='store_true',
+        help='con --input, omite los registros inválidos y los informa por la salida de errores '
+             'en lugar de detenerse en el primero')
+    parser.add_argument(
+        '--schedule',
+        nargs=2,
+        metavar=('DESDE', 'HASTA'),
+        help='escribe los intervalos de restricción de --plate o --plates entre dos fechas AAAA-MM-DD (incluidas)')
+    parser.add_argument(
+        '--plates',
+        metavar='ARCHIVO',
+        help='archivo con una placa por línea ("-" para la entrada estándar): con --schedule escribe sus intervalos, '
+             'y con --date y --time escribe las placas que no pueden circular')
+    parser.add_argument(
+        '--schedule-format',
+        choices=('json', 'ics'),
+        default='json',
+        help='formato de --schedule: json o ics (iCalendar) (por defecto json)')
+    parser.add_argument(
+        '--build-index',
+        nargs='?',
+        const=IndiceFeriados.RUTA,
+        metavar='ARCHIVO',
+        help='construye el índice binario de feriados (por defecto {})'.format(IndiceFeriados.RUTA))
+    parser.add_argument(
+        '--verify-index',
+        nargs='?',
+        const=IndiceFeriados.RUTA,
+        metavar='ARCHIVO',
+        help='compara el índice binario de feriados con VacacionesEcuador')
+    parser.add_argument(
+        '--index-years',
+        nargs=2,
+        type=int,
+        default=(1900, 2100),
+        metavar=('DESDE', 'HASTA'),
+        help='rango de años del índice de feriados (por defecto 1900 2100)')
+    parser.add_argument(
+        '--stats',
+        nargs='?',
+        const='json',
+        choices=('json', 'prometheus'),
+        help='recolecta métricas y las escribe en la salida de errores al terminar (json o prometheus)')
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='inicia el servidor local de predicciones (HTTP y, opcionalmente, socket Unix)')
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='dirección HTTP del servidor (por defecto 127.0.0.1)')
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='puerto HTTP del servidor (por defecto 8080)')
+    parser.add_argument(
+        '--unix-socket',
+        metavar='RUTA',
+        help='socket Unix del servidor para consultas JSON por líneas')
     args = parser.parse_args()
 
+    CLIENTE_FERIADOS.plazo = args.deadline
+    CLIENTE_FERIADOS.respaldo = not args.no_fallback
+
+    if args.stats:
+        METRICAS.activar()
+        atexit.register(lambda: print(
+            METRICAS.prometheus() if args.stats == 'prometheus' else json.dumps(METRICAS.estadisticas(), indent=2),
+            file=sys.stderr))
+
+    if args.serve:
+        servidor = ServidorPicoPlaca(args.host, args.port, args.unix_socket, args.online)
+        try:
+            asyncio.run(servidor.servir())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if args.build_index:
+        indice = IndiceFeriados.construir(args.build_index, *args.index_years)
+        print('Índice de feriados {} ({} - {}, provincias: {})'.format(
+            indice.ruta, indice.desde, indice.hasta, ', '.join(p or 'nacional' for p in indice.provincias)))
+        sys.exit(0)
+
+    if args.verify_index:
+        diferencias = IndiceFeriados(args.verify_index).verificar()
+        for prov, fecha, en_indice, esperado in diferencias:
+            print('{} {}: índice={!r} VacacionesEcuador={!r}'.format(prov or 'nacional', fecha, en_indice, esperado))
+        print('{} diferencias'.format(len(diferencias)))
+        sys.exit(1 if diferencias else 0)
+
+    placas = None
+    if args.plates:
+        with (sys.stdin if args.plates == '-' else open(args.plates, encoding='utf-8')) as archivo:
+            placas = [linea.strip() for linea in archivo if linea.strip()]
+
+    if args.schedule:
+        if placas is None:
+            if not args.plate:
+                parser.error('--schedule requiere --plate o --plates')
+            placas = [args.plate]
+        escribir_ventanas(PicoPlaca.ventanas_restriccion_flota(placas, *args.schedule, online=args.online),
+                          sys.stdout, args.schedule_format)
+        sys.exit(0)
+
+    if args.input:
+        # Un sumidero de errores por archivo: las filas se numeran desde 0 dentro de cada archivo
+        errores = [(ruta, []) for ruta in args.input] if args.skip_invalid else None
+        columnares = {formato_columnar(ruta, args.format) for ruta in args.input}
+        if columnares != {None}:
+            if None in columnares or len(columnares) > 1:
+                parser.error('--input no admite mezclar archivos parquet/arrow con otros formatos')
+            if args.workers > 1:
+                parser.error('--workers no admite los formatos parquet y arrow')
+            if sys.stdout.isatty():
+                parser.error('la salida parquet/arrow es binaria: redirija la salida estándar a un archivo')
+            formato_salida = columnares.pop()
+
+            def _predecir_archivo(ruta, sumidero=None):
+                fila = 0
+                for lote in leer_lotes_arrow(ruta, formato_salida, args.chunk_size):
+                    yield PicoPlaca.predecir_arrow(lote, args.online, errores=sumidero, primera_fila=fila)
+                    fila += lote.num_rows
+
+            escribir_lotes_arrow(
+                itertools.chain.from_iterable(itertools.starmap(_predecir_archivo, errores or
+                                                                ((ruta,) for ruta in args.input))),
+                sys.stdout.buffer, formato_salida)
+            _informar_invalidos(errores)
+            sys.exit(0)
+        formato_salida = args.format or ('jsonl' if all(
+            ruta.lower().endswith(('.jsonl', '.ndjson')) for ruta in args.input) else 'csv')
+        if args.workers > 1:
+            if '-' in args.input:
+                parser.error('--workers requiere archivos de entrada, no la entrada estándar')
+            if args.online:
+                parser.error('--workers no admite --online: cada proceso excedería el límite de tasa de la API')
+            if formato_salida == 'csv':
+                sys.stdout.write(_ENCABEZADO_CSV)
+            for ruta, sumidero in errores or ((ruta, None) for ruta in args.input):
+                for texto in predecir_archivo_paralelo(ruta, args.workers, args.format, args.online, formato_salida,
+                                                       errores=sumidero):
+                    sys.stdout.write(texto)
+                    sys.stdout.flush()
+        else:
+            decisiones = itertools.chain.from_iterable(
+                predecir_flujo(leer_registros(ruta, args.format), args.online, args.chunk_size, sumidero)
+                for ruta, sumidero in errores or ((ruta, None) for ruta in args.input))
+            escribir_decisiones(decisiones, sys.stdout, formato_salida, args.chunk_size)
+        _informar_invalidos(errores)
+        sys.exit(0)
+
+    if placas is not None:
+        if not (args.date and args.time):
+            parser.error('--plates requiere --schedule, o bien --date y --time')
+        for placa in FlotaPicoPlaca(placas).restringidos(args.date, args.time, args.online):
+            print(placa)
+        sys.exit(0)
+
+    if not (args.plate and args.date and args.time):
+        parser.error('se requieren --plate, --date y --time, o bien --input')
 
-    pyp = PicoPlaca(args.placa, args.fecha, args.tiempo, args.online)
+    pyp = PicoPlaca(args.plate, args.date, args.time, args.online)
+    puede_circular, fuente = pyp.predecir_con_fuente() if args.online else (pyp.predecir(), None)
+    if fuente == 'respaldo':
+        print('Aviso: la API de feriados no respondió; se usó el calendario local.', file=sys.stderr)
 
-    if pyp.predecir():
+    if puede_circular:
         print(
             'El vehículo con placa {} PUEDE estar en la carretera el {} a las {}.'.format(
-                args.placa,
-                args.fecha,
-                args.tiempo))
+                args.plate,
+                args.date,
+                args.time))
     else:
         print(
             'El vehículo con placa {} NO PUEDE estar en la carretera el {} a las {}.'.format(
-                args.placa,
-                args.fecha,
-                args.tiempo))
\ No newline at end of file
+                args.plate,
+                args.date,
+                args.time))
@@ -0,0 +1,291 @@
+"""
+Banco de pruebas de rendimiento de U1Lab4.
+
+Mide los caminos críticos del predictor y guarda los resultados en JSON para compararlos
+con una línea base:
+
+    python bench_U1Lab4.py --save base.json
+    python bench_U1Lab4.py --compare base.json --threshold 0.10
+
+Con --compare el proceso termina con código 1 si algún caso es más lento que la línea base
+por encima del umbral. El modo online se mide contra un servidor local que imita la API
+de abstractapi, por lo que no consume cuota ni depende de la red.
+"""
+import argparse
+import datetime
+import http.server
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+import U1Lab4
+from U1Lab4 import ClienteFeriados, PicoPlaca, VacacionesEcuador
+
+# Versión del formato del archivo de resultados
+FORMATO = 1
+RUTA_MODULO = os.path.abspath(U1Lab4.__file__)
+
+
+class _ApiLocal(http.server.BaseHTTPRequestHandler):
+    """Imita la API de feriados de abstractapi: responde una lista vacía (día laborable)"""
+    protocol_version = 'HTTP/1.1'
+    # Respuesta completa en una sola escritura para no medir el retardo de Nagle
+    wbufsize = 1 << 16
+
+    def do_GET(self):
+        cuerpo = b'[]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def medir(funcion, repeticiones=5, minimo=0.2):
+    """
+    Mide una función con timeit
+
+    Parámetros
+    ----------
+    funcion : callable sin argumentos
+    repeticiones : int, opcional
+        número de series medidas (el valor predeterminado es 5)
+    minimo : float, opcional
+        duración mínima en segundos de cada serie (el valor predeterminado es 0.2)
+    Devoluciones
+    -------
+    Devuelve un dict con la mediana y el mínimo en segundos por llamada, y las llamadas por serie
+    """
+    temporizador = timeit.Timer(funcion)
+    llamadas = 1
+    while True:
+        if temporizador.timeit(llamadas) >= minimo:
+            break
+        llamadas *= 2
+    tiempos = sorted(t / llamadas for t in temporizador.repeat(repeticiones, llamadas))
+    return {'mediana_s': tiempos[len(tiempos) // 2], 'min_s': tiempos[0], 'llamadas': llamadas}
+
+
+def caso_predecir_offline(repeticiones):
+    """predecir() sin conexión con la caché de feriados caliente"""
+    PicoPlaca('PBX-1231', '2022-05-16', '08:00').predecir()
+    return medir(lambda: PicoPlaca('PBX-1231', '2022-05-16', '08:00').predecir(), repeticiones)
+
+
+def caso_constructor(repeticiones):
+    """Validación de placa, fecha y tiempo en el constructor"""
+    return medir(lambda: PicoPlaca('PBX-1231', '2022-05-16', '08:00'), repeticiones)
+
+
+def caso_predecir_lote(repeticiones, n=100000):
+    """predecir_lote() por registro, con n registros distintos"""
+    inicio = datetime.date(2022, 1, 1)
+    placas = ['PB{}-{:04d}'.format(chr(65 + i % 26), i % 10000) for i in range(n)]
+    fechas = [(inicio + datetime.timedelta(days=i % 365)).isoformat() for i in range(n)]
+    tiempos = ['{:02d}:{:02d}'.format(i % 24, i % 60) for i in range(n)]
+    resultado = medir(lambda: PicoPlaca.predecir_lote(placas, fechas, tiempos), repeticiones)
+    return {clave: valor / n if clave != 'llamadas' else valor for clave, valor in resultado.items()}
+
+
+def caso_validar_lote(repeticiones, n=100000):
+    """validar_lote() por registro con un 1 % de registros inválidos informados en una lista de errores"""
+    inicio = datetime.date(2022, 1, 1)
+    placas = ['PB{}-{:04d}'.format(chr(65 + i % 26), i % 10000) if i % 100 else 'PB-1' for i in range(n)]
+    fechas = [(inicio + datetime.timedelta(days=i % 365)).isoformat() for i in range(n)]
+    tiempos = ['{:02d}:{:02d}'.format(i % 24, i % 60) for i in range(n)]
+    resultado = medir(lambda: PicoPlaca.validar_lote(placas, fechas, tiempos, []), repeticiones)
+    return {clave: valor / n if clave != 'llamadas' else valor for clave, valor in resultado.items()}
+
+
+def _predecir_online(cliente, repeticiones):
+    """Mide predecir() online usando el cliente dado en lugar de CLIENTE_FERIADOS"""
+    original = U1Lab4.CLIENTE_FERIADOS
+    U1Lab4.CLIENTE_FERIADOS = cliente
+    try:
+        PicoPlaca('PBX-1231', '2022-05-16', '08:00', True).predecir()
+        return medir(lambda: PicoPlaca('PBX-1231', '2022-05-16', '08:00', True).predecir(), repeticiones)
+    finally:
+        U1Lab4.CLIENTE_FERIADOS = original
+        cliente.cerrar()
+
+
+def caso_predecir_online(repeticiones, url, directorio):
+    """predecir() online con una solicitud HTTP por llamada (ttl=0) contra la API local"""
+    cliente = ClienteFeriados(api_key='bench', tasa=1e9, rafaga=1 << 30, ttl=0,
+                              ruta_cache=os.path.join(directorio, 'sin_cache.sqlite3'))
+    cliente.URL = url
+    return _predecir_online(cliente, repeticiones)
+
+
+def caso_predecir_online_cache(repeticiones, url, directorio):
+    """predecir() online respondido desde la caché en disco"""
+    cliente = ClienteFeriados(api_key='bench', tasa=1e9, rafaga=1 << 30,
+                              ruta_cache=os.path.join(directorio, 'con_cache.sqlite3'))
+    cliente.URL = url
+    return _predecir_online(cliente, repeticiones)
+
+
+def _populate_sin_memoria(anios):
+    """
+    Devuelve una función que construye VacacionesEcuador para los años dados vaciando antes la memoria
+    de feriados nacionales, para medir el cálculo y no solo la copia de lo ya calculado
+    """
+    def construir():
+        VacacionesEcuador._NACIONALES.clear()
+        return VacacionesEcuador(prov='EC-P', years=anios)
+    return construir
+
+
+def caso_populate_anio(repeticiones):
+    """VacacionesEcuador._populate para un año, sin la memoria de feriados nacionales"""
+    return medir(_populate_sin_memoria(2022), repeticiones)
+
+
+def caso_populate_rango(repeticiones):
+    """VacacionesEcuador._populate para 1900 - 2100, sin la memoria de feriados nacionales"""
+    return medir(_populate_sin_memoria(list(range(1900, 2101))), repeticiones, minimo=0.05)
+
+
+def caso_feriados_rango(repeticiones):
+    """VacacionesEcuador.feriados_rango vectorizado para 1900 - 2100"""
+    return medir(lambda: VacacionesEcuador.feriados_rango(1900, 2100, 'EC-P'), repeticiones)
+
+
+def caso_cli_frio(repeticiones):
+    """Arranque en frío de la línea de comandos para una consulta"""
+    comando = [sys.executable, RUTA_MODULO, '-p', 'PBX-1231', '-d', '2022-05-16', '-t', '08:00']
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, check=True, stdout=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {'mediana_s': tiempos[len(tiempos) // 2], 'min_s': tiempos[0], 'llamadas': 1}
+
+
+def ejecutar(casos=None, repeticiones=5):
+    """
+    Ejecuta los casos del banco de pruebas
+
+    Parámetros
+    ----------
+    casos : list de str, opcional
+        nombres de los casos (por defecto todos)
+    repeticiones : int, opcional
+        series medidas por caso (el valor predeterminado es 5)
+    Devoluciones
+    -------
+    Devuelve el dict de resultados en el formato del archivo JSON
+    """
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ApiLocal)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/'.format(servidor.server_address[1])
+    directorio = tempfile.mkdtemp(prefix='bench_pico_placa_')
+    disponibles = {
+        'predecir_offline': lambda: caso_predecir_offline(repeticiones),
+        'predecir_online': lambda: caso_predecir_online(repeticiones, url, directorio),
+        'predecir_online_cache': lambda: caso_predecir_online_cache(repeticiones, url, directorio),
+        'predecir_lote_por_registro': lambda: caso_predecir_lote(repeticiones),
+        'validar_lote_por_registro': lambda: caso_validar_lote(repeticiones),
+        'constructor': lambda: caso_constructor(repeticiones),
+        'populate_anio': lambda: caso_populate_anio(repeticiones),
+        'populate_1900_2100': lambda: caso_populate_rango(repeticiones),
+        'feriados_rango_1900_2100': lambda: caso_feriados_rango(repeticiones),
+        'cli_frio': lambda: caso_cli_frio(repeticiones),
+    }
+    resultados = {}
+    try:
+        for nombre in casos or disponibles:
+            if nombre not in disponibles:
+                raise ValueError('Caso desconocido: {} (disponibles: {})'.format(nombre, ', '.join(disponibles)))
+            resultados[nombre] = disponibles[nombre]()
+            print('{:<28} {:>14.3f} us'.format(nombre, resultados[nombre]['mediana_s'] * 1e6), file=sys.stderr)
+    finally:
+        servidor.shutdown()
+    return {
+        'formato': FORMATO,
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+
+
+def comparar(base, actual, umbral):
+    """
+    Compara dos resultados por la mediana de cada caso
+
+    Parámetros
+    ----------
+    base, actual : dict
+        resultados en el formato del archivo JSON
+    umbral : float
+        aumento relativo tolerado (0.10 = 10 %)
+    Devoluciones
+    -------
+    Devuelve una lista de tuplas (caso, mediana base, mediana actual, cambio relativo) con las regresiones
+    """
+    regresiones = []
+    for nombre, medida in actual['resultados'].items():
+        anterior = base['resultados'].get(nombre)
+        if anterior is None:
+            continue
+        cambio = medida['mediana_s'] / anterior['mediana_s'] - 1
+        print('{:<28} {:>12.3f} us -> {:>12.3f} us  {:+7.1%}'.format(
+            nombre, anterior['mediana_s'] * 1e6, medida['mediana_s'] * 1e6, cambio))
+        if cambio > umbral:
+            regresiones.append((nombre, anterior['mediana_s'], medida['mediana_s'], cambio))
+    return regresiones
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Banco de pruebas de rendimiento del predictor Pico y Placa')
+    parser.add_argument(
+        '--only',
+        nargs='+',
+        metavar='CASO',
+        help='casos a ejecutar (por defecto todos)')
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='series medidas por caso (por defecto 5)')
+    parser.add_argument(
+        '--save',
+        metavar='ARCHIVO',
+        help='guarda los resultados en un archivo JSON')
+    parser.add_argument(
+        '--compare',
+        metavar='ARCHIVO',
+        help='compara con una línea base guardada con --save')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.10,
+        help='aumento relativo de la mediana tolerado antes de fallar con --compare (por defecto 0.10)')
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.only, args.repeat)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2)
+    else:
+        json.dump(resultados, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(base, resultados, args.threshold)
+        for nombre, _, _, cambio in regresiones:
+            print('REGRESIÓN {}: {:+.1%}'.format(nombre, cambio), file=sys.stderr)
+        sys.exit(1 if regresiones else 0)
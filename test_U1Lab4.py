@@ -0,0 +1,561 @@
+"""
+Pruebas de U1Lab4. Los caminos vectorizados o precalculados se comparan con el camino escalar
+(PicoPlaca, VacacionesEcuador y los setters) sobre datos aleatorios con semilla fija. El cliente
+de la API de feriados se prueba contra un servidor local, y el servidor de predicciones por sus sockets.
+
+    python -m pytest -q test_U1Lab4.py
+"""
+import asyncio
+import concurrent.futures
+import datetime
+import http.server
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+
+from U1Lab4 import (CacheFeriados, ClienteFeriados, FlotaPicoPlaca, IndiceFeriados, PicoPlaca, ServidorPicoPlaca,
+                    VacacionesEcuador, _mapa_acotado, _registros_jsonl, leer_registros, predecir_archivo_paralelo,
+                    predecir_flujo)
+
+SEMILLA = 20220516
+
+
+def _registros_aleatorios(generador, n):
+    """Genera n registros (placa, fecha, tiempo) válidos entre 2010 y 2035"""
+    letras = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    inicio = datetime.date(2010, 1, 1).toordinal()
+    fin = datetime.date(2035, 12, 31).toordinal()
+    placas, fechas, tiempos = [], [], []
+    for _ in range(n):
+        prefijo = ''.join(generador.choice(letras, generador.choice([2, 3])))
+        placas.append('{}-{:04d}'.format(prefijo, generador.integers(10000)))
+        fechas.append(datetime.date.fromordinal(int(generador.integers(inicio, fin + 1))).isoformat())
+        tiempos.append('{:02d}:{:02d}'.format(generador.integers(24), generador.integers(60)))
+    return placas, fechas, tiempos
+
+
+def _alterar(generador, texto):
+    """Cambia, borra o inserta un carácter al azar en un tercio de los casos; si no, devuelve el texto sin cambios"""
+    i = int(generador.integers(len(texto) + 1))
+    caracter = str(generador.choice(list('0123456789-:AZaz /')))
+    operacion = generador.integers(9)
+    if operacion == 0:
+        return texto[:i] + caracter + texto[i + 1:]
+    if operacion == 1:
+        return texto[:i] + texto[i + 1:]
+    if operacion == 2:
+        return texto[:i] + caracter + texto[i:]
+    return texto
+
+
+def _valido(placa, fecha, tiempo):
+    """Devuelve True si el constructor (los setters) acepta el registro"""
+    try:
+        PicoPlaca(placa, fecha, tiempo)
+    except ValueError:
+        return False
+    return True
+
+
+def test_predecir_lote_igual_a_predecir():
+    generador = np.random.default_rng(SEMILLA)
+    placas, fechas, tiempos = _registros_aleatorios(generador, 5000)
+    # Horas pico y fechas de feriados para cubrir todas las ramas de la regla
+    tiempos[::3] = ['07:{:02d}'.format(m) for m in generador.integers(60, size=len(tiempos[::3]))]
+    feriados = ['2022-01-01', '2022-12-25', '2023-02-20', '2024-11-02', '2025-05-24', '2022-08-10']
+    fechas[::7] = generador.choice(feriados, len(fechas[::7])).tolist()
+    esperado = [PicoPlaca(p, f, t).predecir() for p, f, t in zip(placas, fechas, tiempos)]
+    assert PicoPlaca.predecir_lote(placas, fechas, tiempos).tolist() == esperado
+
+
+def test_predecir_registros_igual_a_predecir_lote():
+    generador = np.random.default_rng(SEMILLA + 1)
+    placas, fechas, tiempos = _registros_aleatorios(generador, 2000)
+    registros = PicoPlaca.analizar_lote(placas, fechas, tiempos)
+    assert (PicoPlaca.predecir_registros(registros) == PicoPlaca.predecir_lote(placas, fechas, tiempos)).all()
+
+
+def test_indice_ida_y_vuelta(tmp_path):
+    ruta = os.path.join(str(tmp_path), 'feriados.idx')
+    indice = IndiceFeriados.construir(ruta, 2015, 2030)
+    try:
+        assert indice.verificar() == []
+        reabierto = IndiceFeriados(ruta)
+        calculado = CacheFeriados(indice=False)
+        desde_indice = CacheFeriados(indice=reabierto)
+        for anio in (2015, 2024, 2030):
+            for prov in [None] + VacacionesEcuador.PROVINCIAS:
+                assert reabierto.mapa(anio, prov) == calculado.mapa(anio, prov), (anio, prov)
+            assert (desde_indice.provincias(anio) == calculado.provincias(anio)).all(), anio
+        reabierto.cerrar()
+    finally:
+        indice.cerrar()
+
+
+@pytest.mark.parametrize('prov', [None] + VacacionesEcuador.PROVINCIAS)
+def test_feriados_rango_igual_a_vacaciones_ecuador(prov):
+    anios = list(range(1990, 2061))
+    calendario = VacacionesEcuador(prov=prov, years=anios)
+    esperado = sorted(f for f in calendario if 1990 <= f.year <= 2060)
+    obtenido = VacacionesEcuador.feriados_rango(1990, 2060, prov).tolist()
+    assert obtenido == esperado
+
+
+def test_feriados_rango_anios_aleatorios():
+    generador = np.random.default_rng(SEMILLA + 2)
+    for anio in generador.integers(1583, 2600, size=20).tolist():
+        prov = str(generador.choice(VacacionesEcuador.PROVINCIAS))
+        esperado = sorted(f for f in VacacionesEcuador(prov=prov, years=anio) if f.year == anio)
+        assert VacacionesEcuador.feriados_rango(anio, anio, prov).tolist() == esperado, (anio, prov)
+
+
+def test_validar_lote_igual_a_setters():
+    generador = np.random.default_rng(SEMILLA + 3)
+    placas, fechas, tiempos = _registros_aleatorios(generador, 3000)
+    placas = [_alterar(generador, p) for p in placas]
+    fechas = [_alterar(generador, f) for f in fechas]
+    tiempos = [_alterar(generador, t) for t in tiempos]
+    # Fechas imposibles y límites de los campos
+    limites = ['2023-02-29', '2024-02-29', '2022-04-31', '0000-01-01', '9999-12-31', '2022-00-10', '2022-13-01']
+    fechas[::50] = generador.choice(limites, len(fechas[::50])).tolist()
+    esperado = [_valido(p, f, t) for p, f, t in zip(placas, fechas, tiempos)]
+    assert 0 < sum(esperado) < len(esperado)
+    errores = []
+    validos, registros = PicoPlaca.validar_lote(placas, fechas, tiempos, errores)
+    assert validos.tolist() == esperado
+    assert [fila for fila, _ in errores] == [i for i, ok in enumerate(esperado) if not ok]
+    for i in np.flatnonzero(validos)[:200].tolist():
+        pyp = PicoPlaca(placas[i], fechas[i], tiempos[i])
+        assert (int(registros['dia'][i]), int(registros['minuto'][i])) == (pyp.dia, pyp.minuto)
+
+
+def test_predecir_flujo_omite_registros_invalidos():
+    lineas = [
+        '{"plate": "PBX-1231", "date": "2022-05-16", "time": "08:00"}',
+        'no es json',
+        '[1, 2]',
+        '{"plate": ["PBX-1231"], "date": "2022-05-16", "time": "08:00"}',
+        '{"plate": "PBX-1232", "date": "2022-02-30", "time": "08:00"}',
+        '{"plate": "PBX-1233"}',
+        '{"placa": "PBX-1234", "fecha": "2022-05-16", "tiempo": "12:00"}',
+    ]
+    errores = []
+    decisiones = list(predecir_flujo(_registros_jsonl(lineas), tamano_bloque=3, errores=errores))
+    assert decisiones == [('PBX-1231', '2022-05-16', '08:00', False), ('PBX-1234', '2022-05-16', '12:00', True)]
+    assert errores == [(1, 'registro_ilegible'), (2, 'registro_ilegible'), (3, 'placa_invalida'),
+                       (4, 'fecha_invalida'), (5, 'fecha_invalida')]
+    with pytest.raises(ValueError):
+        list(predecir_flujo(_registros_jsonl(lineas)))
+
+
+class _ApiFeriados(http.server.BaseHTTPRequestHandler):
+    """API de feriados de prueba: el modo del servidor decide la respuesta"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.solicitudes += 1
+        time.sleep(0.5 if self.server.modo == 'lento' else self.server.pausa)
+        if self.server.modo == 'error' or self.server.fallar > 0:
+            self.server.fallar -= 1
+            cuerpo, estado = b'', 503
+        elif self.server.modo == 'rechazo':
+            cuerpo, estado = b'{"error": "invalid api key"}', 401
+        elif self.server.modo == 'objeto':
+            cuerpo, estado = b'{"error": "quota exceeded"}', 200
+        else:
+            navidad = 'month=12' in self.path and 'day=25' in self.path
+            cuerpo, estado = (b'[{"name": "Christmas Day"}]' if navidad else b'[]'), 200
+        self.send_response(estado)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_feriados():
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ApiFeriados)
+    servidor.modo, servidor.solicitudes, servidor.pausa, servidor.fallar = 'ok', 0, 0.0, 0
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def cliente(api_feriados, tmp_path):
+    def crear(**kwargs):
+        opciones = dict(api_key='clave', tasa=1e6, rafaga=1000, ruta_cache=str(tmp_path / 'feriados.db'), plazo=0.2,
+                        fallos_apertura=2, enfriamiento=0.3)
+        opciones.update(kwargs)
+        nuevo = ClienteFeriados(**opciones)
+        nuevo.URL = 'http://127.0.0.1:{}/'.format(api_feriados.server_address[1])
+        creados.append(nuevo)
+        return nuevo
+    creados = []
+    yield crear
+    for nuevo in creados:
+        nuevo.cerrar()
+
+
+def test_cliente_api_y_cache(api_feriados, cliente):
+    api = cliente()
+    assert api.consultar(datetime.date(2022, 12, 25)) == (True, 'api')
+    assert api.consultar(datetime.date(2022, 12, 25)) == (True, 'cache')
+    assert api.consultar(datetime.date(2022, 5, 16)) == (False, 'api')
+    assert api_feriados.solicitudes == 2
+
+
+def test_cliente_respuesta_inesperada_usa_respaldo(api_feriados, cliente):
+    api = cliente()
+    api_feriados.modo = 'objeto'
+    # 2022-08-12 es feriado nacional en el calendario local (10 de agosto trasladado)
+    assert api.consultar(datetime.date(2022, 8, 12)) == (True, 'respaldo')
+    assert api.consultar(datetime.date(2022, 8, 11)) == (False, 'respaldo')
+    assert api.interruptor.estado() == 'abierto'
+    api.respaldo = False
+    api.interruptor.exito()
+    with pytest.raises(ValueError):
+        api.consultar(datetime.date(2022, 8, 15))
+
+
+def test_cliente_plazo_cuenta_como_fallo(api_feriados, cliente):
+    api = cliente()
+    api_feriados.modo = 'lento'
+    inicio = time.perf_counter()
+    assert api.consultar(datetime.date(2022, 3, 8)) == (False, 'respaldo')
+    assert api.consultar(datetime.date(2022, 3, 9)) == (False, 'respaldo')
+    assert time.perf_counter() - inicio < 0.9
+    assert api.interruptor.estado() == 'abierto'
+    # Con el interruptor abierto no se envían solicitudes
+    solicitudes = api_feriados.solicitudes
+    assert api.consultar(datetime.date(2022, 3, 10)) == (False, 'respaldo')
+    assert api_feriados.solicitudes == solicitudes
+    # Tras el enfriamiento, una respuesta correcta cierra el interruptor
+    api_feriados.modo = 'ok'
+    time.sleep(0.6)
+    assert api.consultar(datetime.date(2022, 3, 11)) == (False, 'api')
+    assert api.interruptor.estado() == 'cerrado'
+    # La respuesta tardía terminó en segundo plano y quedó en la caché en disco
+    assert api.consultar(datetime.date(2022, 3, 8)) == (False, 'cache')
+
+
+def test_cliente_sin_respaldo_propaga_el_error(api_feriados, cliente):
+    api = cliente(respaldo=False, fallos_apertura=100)
+    api_feriados.modo = 'lento'
+    with pytest.raises(requests.Timeout):
+        api.consultar(datetime.date(2022, 4, 1))
+    api_feriados.modo = 'error'
+    with pytest.raises(requests.HTTPError):
+        api.consultar(datetime.date(2022, 4, 2))
+
+
+def test_cliente_limita_solicitudes_pendientes(api_feriados, cliente):
+    api = cliente(conexiones=1, fallos_apertura=100)
+    api_feriados.modo = 'lento'
+    assert api.consultar(datetime.date(2022, 6, 1)) == (False, 'respaldo')
+    # La primera solicitud sigue ocupando el único hueco: la segunda no llega a la API
+    solicitudes = api_feriados.solicitudes
+    assert api.consultar(datetime.date(2022, 6, 2)) == (False, 'respaldo')
+    assert api_feriados.solicitudes == solicitudes
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.txt'])
+def test_leer_registros_csv(tmp_path, extension):
+    ruta = tmp_path / ('registros' + extension)
+    # Encabezado en español, columnas en otro orden, espacios y una fila corta
+    ruta.write_text('Hora, fecha ,PLACA\n08:00,2022-05-16,PBX-1231\n\n"12:00",2022-05-17, PBX-1232\n09:00\n',
+                    encoding='utf-8')
+    assert list(leer_registros(str(ruta))) == [('PBX-1231', '2022-05-16', '08:00'),
+                                              ('PBX-1232', '2022-05-17', '12:00'), ('', '', '09:00')]
+    # Sin encabezado se toman las tres primeras columnas en orden
+    ruta.write_text('PBX-1231,2022-05-16,08:00,extra\n', encoding='utf-8')
+    assert list(leer_registros(str(ruta), 'csv')) == [('PBX-1231', '2022-05-16', '08:00')]
+
+
+def test_leer_registros_jsonl(tmp_path):
+    ruta = tmp_path / 'registros.jsonl'
+    ruta.write_text('{"placa": "PBX-1231", "fecha": "2022-05-16", "hora": "08:00"}\n\n'
+                    '{"plate": "PBX-1232", "date": "2022-05-17", "time": null}\n[]\n', encoding='utf-8')
+    assert list(leer_registros(str(ruta))) == [('PBX-1231', '2022-05-16', '08:00'),
+                                              ('PBX-1232', '2022-05-17', ''), ('', '', '')]
+    # Sin extensión conocida el formato se deduce de la primera línea
+    otra = tmp_path / 'registros.dat'
+    otra.write_text(ruta.read_text(encoding='utf-8'), encoding='utf-8')
+    assert list(leer_registros(str(otra))) == list(leer_registros(str(ruta)))
+
+
+@pytest.mark.parametrize('encabezado, columna', [('plate,date\n', 'time'), ('placa,tiempo\n', 'date')])
+def test_encabezado_incompleto(tmp_path, encabezado, columna):
+    ruta = tmp_path / 'registros.csv'
+    ruta.write_text(encabezado + 'PBX-1231,2022-05-16\n', encoding='utf-8')
+    with pytest.raises(ValueError, match=columna):
+        list(leer_registros(str(ruta)))
+    with pytest.raises(ValueError, match=columna):
+        list(predecir_archivo_paralelo(str(ruta), 1))
+
+
+def _llenar_cache(api, anio, excepto):
+    """Guarda en la caché en disco una respuesta vacía para cada día del año salvo las fechas indicadas"""
+    api._abrir()
+    fecha = datetime.date(anio, 1, 1)
+    while fecha.year == anio:
+        if fecha not in excepto:
+            api._guardar_cache(fecha, '[]')
+        fecha += datetime.timedelta(days=1)
+
+
+def test_precargar_sin_plazo_reintenta_y_omite(api_feriados, cliente):
+    api = cliente(plazo=0.1, fallos_apertura=100)
+    pendientes = [datetime.date(2021, 1, 4), datetime.date(2021, 1, 5), datetime.date(2021, 1, 6)]
+    _llenar_cache(api, 2021, pendientes)
+    # Respuestas más lentas que el plazo interactivo; las dos primeras solicitudes fallan con 503
+    api_feriados.pausa, api_feriados.fallar = 0.2, 2
+    errores = []
+    assert api.precargar(2021, en_segundo_plano=False, reintentos=1, espera=0.01, errores=errores) == 2
+    assert [fecha for fecha, _ in errores] == pendientes[:1]
+    assert isinstance(errores[0][1], requests.HTTPError)
+    assert api_feriados.solicitudes == 4
+    api_feriados.pausa = 0.0
+    assert [api.consultar(fecha)[1] for fecha in pendientes] == ['api', 'cache', 'cache']
+
+
+def test_precargar_espera_el_interruptor(api_feriados, cliente):
+    api = cliente(fallos_apertura=1, enfriamiento=0.3)
+    _llenar_cache(api, 2021, [datetime.date(2021, 7, 1)])
+    api.interruptor.fallo()
+    inicio = time.perf_counter()
+    futuro = api.precargar(2021)
+    assert futuro.result(timeout=5) == 1
+    assert time.perf_counter() - inicio >= 0.3
+    assert api.interruptor.estado() == 'cerrado'
+
+
+def test_precargar_se_detiene_con_errores_no_transitorios(api_feriados, cliente):
+    api = cliente()
+    api_feriados.modo = 'rechazo'
+    with pytest.raises(requests.HTTPError):
+        api.precargar(2021, en_segundo_plano=False)
+    assert isinstance(api.precargar(2021).exception(timeout=5), requests.HTTPError)
+    assert api_feriados.solicitudes == 2
+    # cancel() detiene una precarga en curso antes de la siguiente fecha
+    api_feriados.modo, api_feriados.pausa = 'ok', 0.05
+    futuro = api.precargar(2022)
+    time.sleep(0.2)
+    assert futuro.cancel()
+    time.sleep(0.1)
+    solicitudes = api_feriados.solicitudes
+    time.sleep(0.2)
+    assert api_feriados.solicitudes == solicitudes
+
+
+def test_consultar_async_agrupa_y_no_bloquea_el_bucle(api_feriados, cliente):
+    api = cliente(plazo=1.0)
+    api_feriados.pausa = 0.1
+    hilos = set()
+    leer_cache = api._leer_cache
+
+    def leer_cache_registrando(fecha):
+        hilos.add(threading.current_thread())
+        return leer_cache(fecha)
+
+    api._leer_cache = leer_cache_registrando
+    navidad, otra = datetime.date(2022, 12, 25), datetime.date(2022, 12, 26)
+
+    async def consultar_todas():
+        return await asyncio.gather(*(api.consultar_async(f) for f in [navidad] * 10 + [otra] * 5))
+
+    resultados = asyncio.run(consultar_todas())
+    assert resultados == [(True, 'api')] * 10 + [(False, 'api')] * 5
+    assert api_feriados.solicitudes == 2
+    assert threading.main_thread() not in hilos
+    assert asyncio.run(consultar_todas()) == [(True, 'cache')] * 10 + [(False, 'cache')] * 5
+    assert api_feriados.solicitudes == 2
+
+
+def test_predecir_archivo_paralelo_igual_a_predecir_flujo(tmp_path):
+    generador = np.random.default_rng(SEMILLA + 4)
+    placas, fechas, tiempos = _registros_aleatorios(generador, 3000)
+    fechas = [_alterar(generador, f) for f in fechas]
+    ruta = tmp_path / 'registros.csv'
+    ruta.write_text('time,plate,date\n' + ''.join(
+        '{},{},{}\n'.format(t, p, f) for p, f, t in zip(placas, fechas, tiempos)), encoding='utf-8')
+    esperados = []
+    decisiones = list(predecir_flujo(leer_registros(str(ruta)), errores=esperados))
+    errores = []
+    # Fragmentos pequeños: muchos más fragmentos que la ventana de 2 por trabajador
+    textos = list(predecir_archivo_paralelo(str(ruta), 2, formato_salida='jsonl', tamano_fragmento=2048,
+                                            errores=errores))
+    assert len(textos) > 20
+    obtenidas = [json.loads(linea) for linea in ''.join(textos).splitlines()]
+    assert [(d['plate'], d['date'], d['time'], d['allowed']) for d in obtenidas] == decisiones
+    assert errores == esperados and esperados
+
+
+def test_mapa_acotado_limita_las_tareas_pendientes():
+    en_curso, maximo = [0], [0]
+    cerrojo = threading.Lock()
+
+    def tarea(i):
+        with cerrojo:
+            en_curso[0] += 1
+            maximo[0] = max(maximo[0], en_curso[0])
+        time.sleep(0.001)
+        return i * i
+
+    def consumir(resultados):
+        for resultado in resultados:
+            with cerrojo:
+                en_curso[0] -= 1
+            yield resultado
+
+    with concurrent.futures.ThreadPoolExecutor(4) as grupo:
+        assert list(consumir(_mapa_acotado(grupo, tarea, range(200), 3))) == [i * i for i in range(200)]
+    assert maximo[0] <= 3
+
+
+def test_ventanas_restriccion_flota_igual_a_predecir_lote():
+    generador = np.random.default_rng(SEMILLA + 5)
+    placas = _registros_aleatorios(generador, 12)[0] + ['PBX-1230', 'PBX-1231']
+    # Dos semanas con el feriado del 23 de mayo de 2022 (lunes)
+    desde, dias = datetime.date(2022, 5, 16), 14
+    ventanas = PicoPlaca.ventanas_restriccion_flota(placas, desde, desde + datetime.timedelta(days=dias - 1))
+    assert ventanas.keys() == set(placas)
+    fechas = np.repeat([(desde + datetime.timedelta(days=d)).isoformat() for d in range(dias)], 1440).tolist()
+    tiempos = ['{:02d}:{:02d}'.format(m // 60, m % 60) for m in range(1440)] * dias
+    inicio = np.datetime64(desde, 'm')
+    for placa in placas:
+        restringido = np.zeros(dias * 1440, dtype=bool)
+        for a, b in ((ventanas[placa] - inicio).astype(np.int64)).tolist():
+            restringido[a:b] = True
+        permitido = PicoPlaca.predecir_lote([placa] * len(fechas), fechas, tiempos)
+        assert (restringido == ~permitido).all(), placa
+
+
+def test_ventanas_restriccion_flota_consulta_solo_dias_restringidos(monkeypatch):
+    consultados = []
+
+    def es_feriado(dia, online):
+        consultados.append(dia)
+        return False
+
+    monkeypatch.setattr(PicoPlaca, '_PicoPlaca__is_holiday', staticmethod(es_feriado))
+    ventanas = PicoPlaca.ventanas_restriccion_flota(['PBX-1231', 'ABC-0002'], '2022-05-01', '2022-06-30',
+                                                    online=True)
+    restringidos = {int(a) // 1440 for v in ventanas.values() for a in v[:, 0].astype(np.int64).tolist()}
+    assert restringidos and sorted(consultados) == sorted(restringidos)
+
+
+async def _leer_respuesta_http(lector):
+    """Lee una respuesta HTTP/1.1 y devuelve (estado, cuerpo decodificado)"""
+    cabecera = (await lector.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    longitud = next(int(linea.split(':', 1)[1]) for linea in cabecera if linea.lower().startswith('content-length:'))
+    cuerpo = await lector.readexactly(longitud)
+    return int(cabecera[0].split(' ')[1]), json.loads(cuerpo)
+
+
+def test_servidor_http_encadenado_y_errores():
+    consultas = [
+        ('POST', '/predict', b'{"plate": "PBX-1231", "date": "2022-05-16", "time": "08:00"}'),
+        ('POST', '/predict', b'no es json'),
+        ('POST', '/predict', b'{"plate": "PBX-1231", "date": "2022-05-16"}'),
+        ('POST', '/predict', b'{"placa": "PBX-1231", "fecha": "2022-02-30", "tiempo": "08:00"}'),
+        ('POST', '/predict', b'{"records": [{"plate": "PBX-1231", "date": "2022-05-16", "time": "08:00"},'
+                             b' {"placa": "PBX-1234", "fecha": "2022-05-16", "tiempo": "12:00"}]}'),
+        ('POST', '/predict', b'{"records": [1]}'),
+        ('GET', '/health', b''),
+        ('GET', '/nada', b''),
+    ]
+
+    async def probar():
+        servidor = ServidorPicoPlaca(puerto=0)
+        await servidor.iniciar()
+        try:
+            lector, escritor = await asyncio.open_connection('127.0.0.1', servidor.puerto)
+            # Todas las solicitudes se envían antes de leer la primera respuesta
+            escritor.write(b''.join('{} {} HTTP/1.1\r\nHost: x\r\nContent-Length: {}\r\n\r\n'.format(
+                metodo, ruta, len(cuerpo)).encode('latin-1') + cuerpo for metodo, ruta, cuerpo in consultas))
+            await escritor.drain()
+            respuestas = [await _leer_respuesta_http(lector) for _ in consultas]
+            escritor.close()
+            return respuestas
+        finally:
+            for abierto in servidor.servidores:
+                abierto.close()
+
+    respuestas = asyncio.run(probar())
+    assert [estado for estado, _ in respuestas] == [200, 400, 400, 400, 200, 400, 200, 404]
+    assert respuestas[0][1] == {'allowed': False}
+    assert respuestas[1][1]['error'].startswith('JSON inválido')
+    assert respuestas[2][1] == {'error': 'falta el campo time'}
+    assert respuestas[4][1] == {'allowed': [False, True]}
+    assert respuestas[6][1] == {'ok': True}
+
+
+@pytest.mark.skipif(not hasattr(asyncio, 'open_unix_connection'), reason='requiere sockets Unix')
+def test_servidor_lineas_unix(tmp_path):
+    lineas = [b'{"plate": "PBX-1234", "date": "2022-05-16", "time": "12:00"}', b'', b'[1, 2]', b'{"records": 5}',
+              b'{"records": []}']
+
+    async def probar():
+        servidor = ServidorPicoPlaca(host=None, socket_unix=str(tmp_path / 'pico_placa.sock'))
+        await servidor.iniciar()
+        try:
+            lector, escritor = await asyncio.open_unix_connection(servidor.socket_unix)
+            escritor.write(b'\n'.join(lineas) + b'\n')
+            await escritor.drain()
+            respuestas = [json.loads(await lector.readline()) for _ in range(len(lineas) - 1)]
+            escritor.close()
+            return respuestas
+        finally:
+            for abierto in servidor.servidores:
+                abierto.close()
+
+    respuestas = asyncio.run(probar())
+    assert respuestas[0] == {'allowed': True}
+    assert respuestas[1]['error'].startswith('Se esperaba un objeto JSON')
+    assert respuestas[2] == {'error': 'records debe ser una lista de objetos JSON'}
+    assert respuestas[3] == {'allowed': []}
+
+
+def test_flota_restringidos_igual_a_predecir_lote():
+    generador = np.random.default_rng(SEMILLA + 6)
+    placas = _registros_aleatorios(generador, 400)[0]
+    flota = FlotaPicoPlaca(placas)
+    assert len(flota) == len(set(placas))
+    _, fechas, tiempos = _registros_aleatorios(generador, 60)
+    # Horas pico de días laborables y un feriado en lunes (2022-05-23)
+    tiempos[::2] = ['{:02d}:{:02d}'.format(h, m) for h, m in zip(
+        generador.choice([6, 7, 8, 16, 17, 18, 19], 30).tolist(), generador.integers(60, size=30).tolist())]
+    fechas[:3] = ['2022-05-23', '2022-05-16', '2024-01-01']
+    tiempos[:3] = ['07:30', '07:30', '08:00']
+    quitadas, encontradas = placas[::3], 0
+    for paso in range(2):
+        registradas = list(flota)
+        for fecha, tiempo in zip(fechas, tiempos):
+            permitido = PicoPlaca.predecir_lote(registradas, [fecha] * len(registradas), [tiempo] * len(registradas))
+            esperado = set(itertools.compress(registradas, (~permitido).tolist()))
+            obtenido = flota.restringidos(fecha, tiempo)
+            assert len(obtenido) == len(esperado) and set(obtenido) == esperado, (fecha, tiempo)
+            encontradas += len(obtenido)
+        assert flota.quitar(quitadas + ['ZZZ-0000']) == (len(set(quitadas)) if paso == 0 else 0)
+    assert encontradas and not any(placa in flota for placa in quitadas)
+
+
+def test_flota_agregar_valida_todas_las_placas():
+    flota = FlotaPicoPlaca(['PBX-1231'])
+    with pytest.raises(ValueError):
+        flota.agregar(['PBX-2221', 'pbx-1231'])
+    assert list(flota) == ['PBX-1231']
+    assert flota.agregar(['PBX-1231', 'PBY-0001', 'PBY-0001']) == 1
+    with pytest.raises(ValueError):
+        flota.restringidos('2022-05-16', '7:30')